@@ -35,12 +35,21 @@ class App(tk.Tk):
         self.info_panel.update_phase_label(phase)
 
     def clear_drawing(self):
-        self.kp_panel.delete("all")
+        self.kp_panel.clear_canvas()
         self.dag_panel.delete("all")
         self.kp_panel.clear_vertices()
         self.dag_panel.clear()
         self.update_phase("DRAW")
 
+    def cancel_build(self):
+        # stop the background build and go back to editing the same polygon
+        if self.phase == "DRAW":
+            return
+        self.kp_panel.cancel_build()
+        self.dag_panel.delete("all")
+        self.dag_panel.clear()
+        self.update_phase("DRAW")
+
     def start_search_path(self, event=None):
         self.info_panel.label.config(text="`Enter` Pressed: Showing Search Path..... ")
         self.dag_panel.show_search_path()
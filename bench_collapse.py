@@ -0,0 +1,38 @@
+# bench_collapse.py
+"""
+FrozenIndex.collapse: depth, node count and batch query time before and after,
+for a few fan-out caps. Answers are checked against the original index.
+"""
+import time
+import numpy as np
+from kp import Kirkpatrick, generate_simple_polygon
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+if __name__ == "__main__":
+    np.random.seed(3)
+    for n in [1000, 10000, 50000]:
+        kp = Kirkpatrick(generate_simple_polygon(n), force_dag=True)
+        kp.preprocessing()
+        index = kp.freeze()
+        # inside the bounding box, so every query really goes through the DAG
+        queries = np.random.uniform(-1, 1, size=(200000, 2))
+        expected = index.locate_many(queries)
+        rows = [("original", index, 0.0)]
+        for max_fanout in [4, 8, 16, 32]:
+            start_time = time.perf_counter()
+            collapsed = index.collapse(max_fanout)
+            rows.append((f"fan-out {max_fanout}", collapsed, time.perf_counter() - start_time))
+        for name, candidate, build in rows:
+            mismatches = int((candidate.locate_many(queries) != expected).sum())
+            elapsed = best_of(lambda: candidate.locate_many(queries))
+            print(f"n={n:6d} {name:11s} depth {candidate.depth():3d}  nodes {len(candidate.is_leaf):8d}  "
+                  f"query {elapsed / len(queries) * 1e6:.2f}us  pass {build:.2f}s  mismatches {mismatches}")
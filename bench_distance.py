@@ -0,0 +1,34 @@
+# bench_distance.py
+"""
+FrozenIndex.distance_many against shapely's distance to the polygon's
+exterior ring (O(n) per point), and how both grow with n.
+"""
+import time
+import numpy as np
+from kp import Kirkpatrick, generate_simple_polygon
+
+if __name__ == "__main__":
+    import shapely
+    from shapely.geometry import Polygon
+
+    np.random.seed(6)
+    for n in [1000, 5000, 20000, 50000]:
+        points = generate_simple_polygon(n)
+        kp = Kirkpatrick(points, force_dag=True)
+        kp.preprocessing()
+        index = kp.freeze()
+        polygon = Polygon(points)
+        queries = np.random.uniform(-1.3, 1.3, size=(2000, 2))
+
+        start_time = time.perf_counter()
+        index.boundary_edges()
+        setup = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        signed, _ = index.distance_many(queries)
+        ours = (time.perf_counter() - start_time) / len(queries)
+        start_time = time.perf_counter()
+        expected = shapely.distance(polygon.exterior, shapely.points(queries))
+        theirs = (time.perf_counter() - start_time) / len(queries)
+        expected = np.where(shapely.contains_xy(polygon, queries[:, 0], queries[:, 1]), -expected, expected)
+        print(f"n={n:6d}  index {ours * 1e6:7.1f}us  shapely {theirs * 1e6:7.1f}us  "
+              f"(edge table {setup:.2f}s once)  max error {np.abs(signed - expected).max():.1e}")
@@ -0,0 +1,42 @@
+# bench_import.py
+"""
+Cold-start cost of importing the engine: wall time and peak RSS of a fresh
+interpreter that only does `import <module>`. Each run is appended to
+import_results.txt so regressions show up in the history.
+"""
+import os
+import subprocess
+import sys
+import time
+
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, rss / 1024 if sys.platform != "darwin" else rss / 2 ** 20)
+"""
+
+
+def measure(module, repeat=5):
+    times, rss = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        rss.append(float(out[1]))
+    return min(times), min(rss)
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or ["numpy", "kp"]
+    new_file = not os.path.exists("import_results.txt")
+    with open("import_results.txt", "a") as results:
+        if new_file:
+            results.write("Date\tModule\tImport Time\tPeak RSS\n")
+        for module in modules:
+            elapsed, rss = measure(module)
+            line = f"{time.strftime('%Y-%m-%d')}\t{module}\t{elapsed * 1000:.1f} ms\t{rss:.1f} MB"
+            print(line)
+            results.write(line + "\n")
@@ -0,0 +1,44 @@
+# bench_ordering.py
+"""
+Does reordering batch queries along a space filling curve pay for itself?
+Compares plain, Hilbert and Morton ordered locate_many on uniform and clustered inputs.
+"""
+import time
+import numpy as np
+from kp import Kirkpatrick, generate_simple_polygon
+
+
+def uniform_points(n):
+    return np.random.rand(n, 2)
+
+
+def clustered_points(n, clusters=20, spread=0.01):
+    centers = np.random.rand(clusters, 2)
+    labels = np.random.randint(clusters, size=n)
+    return centers[labels] + np.random.normal(scale=spread, size=(n, 2))
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+if __name__ == "__main__":
+    for n in [1000, 10000]:
+        kp = Kirkpatrick(generate_simple_polygon(n))
+        kp.preprocessing()
+        index = kp.freeze()
+        for name, make in [("uniform", uniform_points), ("clustered", clustered_points)]:
+            for num_queries in [1000, 100000]:
+                queries = make(num_queries)
+                expected = index.locate_many(queries)
+                row = [f"n={n:6d} {name:9s} queries={num_queries:6d}"]
+                for order in [None, "hilbert", "morton"]:
+                    assert (index.locate_many(queries, order=order) == expected).all()
+                    elapsed = best_of(lambda: index.locate_many(queries, order=order))
+                    row.append(f"{order or 'input'} {elapsed / num_queries * 1e6:.2f}us")
+                print("  ".join(row))
@@ -0,0 +1,49 @@
+# bench_window.py
+"""
+FrozenIndex.query_window / clipped_inside_area against a brute force scan of
+every leaf, for windows of a few sizes. With shapely installed the area is
+also checked against Polygon.intersection(box).
+"""
+import time
+import numpy as np
+from kp import Kirkpatrick, generate_simple_polygon
+from geometry import triangles_intersect_box
+
+
+def brute_force_window(index, xmin, ymin, xmax, ymax):
+    leaves = np.flatnonzero(index.is_leaf)
+    return leaves[triangles_intersect_box(index.tri[leaves], xmin, ymin, xmax, ymax)]
+
+
+if __name__ == "__main__":
+    try:
+        from shapely.geometry import Polygon, box
+    except ImportError:
+        Polygon = None
+    np.random.seed(4)
+    for n in [1000, 10000, 50000]:
+        points = generate_simple_polygon(n)
+        kp = Kirkpatrick(points, force_dag=True)
+        kp.preprocessing()
+        index = kp.freeze()
+        polygon = Polygon(points) if Polygon else None
+        for size in [0.01, 0.1, 1.0]:
+            windows = []
+            for x, y in np.random.uniform(-1, 1, size=(20, 2)):
+                windows.append((x, y, x + size, y + size))
+            mismatches = 0
+            area_error = 0.0
+            start_time = time.perf_counter()
+            found = [len(index.query_window(*window)) for window in windows]
+            dag_time = (time.perf_counter() - start_time) / len(windows)
+            start_time = time.perf_counter()
+            for window in windows:
+                brute_force_window(index, *window)
+            brute_time = (time.perf_counter() - start_time) / len(windows)
+            for window in windows:
+                mismatches += not np.array_equal(index.query_window(*window), brute_force_window(index, *window))
+                if polygon is not None:
+                    area_error = max(area_error, abs(index.clipped_inside_area(*window) -
+                                                     polygon.intersection(box(*window)).area))
+            print(f"n={n:6d} window {size:5.2f}  leaves {np.mean(found):8.1f}  dag {dag_time * 1000:7.2f}ms  "
+                  f"brute force {brute_time * 1000:7.2f}ms  mismatches {mismatches}  max area error {area_error:.2e}")
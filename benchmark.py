@@ -0,0 +1,130 @@
+# benchmark.py
+"""
+    TEST Kirkpatrick POINT LOCATION PERFORMANCE
+"""
+import time
+import numpy as np
+from kp import Kirkpatrick, generate_simple_polygon
+
+if __name__ == "__main__":
+    # plotting and table dependencies are only needed here, not by the engine
+    from shapely.geometry import Polygon, Point
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    # num_points = [1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 11000, 12000, 13000, 14000, 15000, 16000, 17000, 18000, 19000, 20000]
+    # num_points = [1000, 2000, 3000]
+    num_points = [n for n in range(500, 30001, 500)]
+    preprocessing_times = []
+    avg_query_times = []
+    
+    for n in num_points:
+        points = generate_simple_polygon(n)
+        polygon = Polygon(points) # testing the accuracy of the result using shapely  
+        kp = Kirkpatrick(points)
+        start_time = time.time()
+        kp.preprocessing()
+        preprocessing_times.append(time.time() - start_time)
+        query_times = []
+        for _ in range(500):
+            point = np.random.rand(2)
+            shapely_point = Point(point)
+            
+            start_time = time.time()
+            inside_kp  = kp.point_location(point)
+            query_times.append(time.time() - start_time)
+            
+            inside_shapely = shapely_point.within(polygon)           
+            # test point location result       
+            if inside_kp  != inside_shapely:
+                raise ValueError("Mismatch between Kirkpatrick and Shapely results for point:", point)
+        avg_query_times.append(np.mean(query_times))
+        
+    # Table  
+    results_df = pd.DataFrame({
+        'Num Points': num_points,
+        'Preprocessing Time': preprocessing_times,
+        'Average Query Time': avg_query_times
+    })
+
+    print(results_df)
+    # Save as a tab-separated values file (.txt)
+    results_df.to_csv('results.txt', sep='\t', index=False)
+
+
+    # Plotting
+    # fig, ax1 = plt.subplots()
+
+    # color = 'tab:red'
+    # ax1.set_xlabel('Num Points')
+    # ax1.set_ylabel('Preprocessing Time', color=color)
+    # ax1.plot(results_df['Num Points'], results_df['Preprocessing Time'], color=color)
+    # ax1.tick_params(axis='y', labelcolor=color)
+
+    # ax2 = ax1.twinx()
+    # color = 'tab:blue'
+    # ax2.set_ylabel('Average Query Time', color=color)
+    # ax2.plot(results_df['Num Points'], results_df['Average Query Time'], color=color)
+    # ax2.tick_params(axis='y', labelcolor=color)
+
+    # fig.tight_layout()
+    # plt.title('Kirkpatrick Point Location Time Complexity')
+    # plt.show()
+    
+    # Plot Preprocessing Time
+    plt.figure(figsize=(10, 6))
+    plt.plot(results_df['Num Points'], results_df['Preprocessing Time'], marker='o', linestyle='-', color='r')
+    plt.title('Preprocessing Time Complexity Analysis')
+    plt.xlabel('Number of Points')
+    plt.ylabel('Preprocessing Time (seconds)')
+    plt.grid(True, which="both", ls="--")
+    plt.show()
+
+    # Plot Average Query Time
+    plt.figure(figsize=(10, 6))
+    plt.plot(results_df['Num Points'], results_df['Average Query Time'], marker='o', linestyle='-', color='b')
+    plt.title('Query Time Complexity Analysis ')
+    plt.xlabel('Number of Points')
+    plt.ylabel('Average Query Time (seconds)')
+    plt.grid(True, which="both", ls="--")
+    plt.show()
+    
+    # Plotting Preprocessing Time using a Log-Log Plot
+    plt.figure(figsize=(10, 6))
+    plt.loglog(results_df['Num Points'], results_df['Preprocessing Time'], marker='o', linestyle='-', color='r')
+    plt.xlabel('Log Number of Points')
+    plt.ylabel('Log Preprocessing Time (seconds)')
+    plt.title('Preprocessing Time Complexity Analysis Log-Log Plot')
+    plt.grid(True, which="both", ls="--")
+
+    plt.show()
+    
+    # Plotting Preprocessing Time using a Semi-Log Plot (Logarithmic y-axis)
+    plt.figure(figsize=(10, 6))
+    plt.semilogy(results_df['Num Points'], results_df['Preprocessing Time'], marker='o', linestyle='-', color='r')
+    plt.xlabel('Number of Points')
+    plt.ylabel('Log Preprocessing Time (seconds)')
+    plt.title('Preprocessing Time Complexity Analysis Semi-Log Plot (Log y-axis)')
+    plt.grid(True, which="both", ls="--")
+
+    plt.show()
+
+    # Plotting Average Query Time using a Semi-Log Plot (Logarithmic y-axis)
+    plt.figure(figsize=(10, 6))
+    plt.semilogy(results_df['Num Points'], results_df['Average Query Time'], marker='o', linestyle='-', color='b')
+    plt.xlabel('Number of Points')
+    plt.ylabel('Log Average Query Time (seconds)')
+    plt.title('Query Time Complexity Analysis Semi-Log Plot')
+    plt.grid(True, which="both", ls="--")
+
+    plt.show()
+    
+    # Plotting Average Query Time using a Log-Log Plot
+    plt.figure(figsize=(10, 6))
+    plt.loglog(results_df['Num Points'], results_df['Average Query Time'], marker='o', linestyle='-', color='b')
+    plt.xlabel('Log Number of Points')
+    plt.ylabel('Log Average Query Time (seconds)')
+    plt.title('Query Time Complexity Analysis Log-Log Plot')
+    plt.grid(True, which="both", ls="--")
+
+    plt.show()
@@ -0,0 +1,184 @@
+# compact.py
+"""
+Float32 storage for the frozen DAG.
+
+Batch queries are bound by memory traffic, and most of the bytes of a
+FrozenIndex are the float64 triangle coordinates. CompactIndex keeps them as
+float32 (relative to the centre of the polygon, which keeps as many bits as
+possible where the triangles are small) and the child arrays as int32.
+
+Every orientation test is done in float32 together with a conservative bound
+on how far that result can be from the exact one. Only tests that land inside
+the bound are redone with the exact predicates on the float64 coordinates,
+which are kept once per vertex rather than once per triangle. A test that
+passes the filter has the sign of the exact test, so answers are identical to
+FrozenIndex.
+"""
+import numpy as np
+from kp import FrozenIndex, query_stats
+from geometry import points_inside_triangles
+from predicates import STATIC, combine
+
+U32 = np.finfo(np.float32).eps / 2  # unit roundoff
+
+# Error of fl32(sign(p, a, b)) once the coordinates themselves have been rounded to float32
+# (each by at most M * U32, M the largest coordinate magnitude in the test):
+#   each difference is off by at most e = 4 M U32, each product by e * (|d1| + |d2|) + e**2
+#   plus its own rounding; with S the sum of the four |differences| that is below
+#   S * (2 e + 4 U32 S) + 8 e**2, which also leaves a factor of two over the float32
+#   rounding of the bound itself.
+E = 4.04 * U32
+# below this many tests per call the float32 filter costs more than it saves, the leaf walks
+# (rasterize, distance) locate a few rows at a time; those go straight to float64
+SMALL_BATCH = 4096
+
+
+class CompactIndex(FrozenIndex):
+    def __init__(self, tri32, origin, vertices, tri_vertex, child_ptr, child_idx, is_leaf, is_inside, node_ids):
+        self.tri32 = tri32  # (n, 3, 2) float32 coordinates relative to origin
+        self.origin = origin  # float64 (2,)
+        self.vertices = vertices  # (v, 2) exact float64 coordinates
+        self.tri_vertex = tri_vertex  # (n, 3) int32 rows of vertices, for the exact fallback
+        self.child_ptr = child_ptr
+        self.child_idx = child_idx
+        self.is_leaf = is_leaf
+        self.is_inside = is_inside
+        self.node_ids = node_ids
+        self.root_id = int(node_ids[0])
+        self.neighbours = None
+        self.boundary = None
+        self.bounds = None
+        self.hull = None
+        self.use_hull = False  # set to also test the convex hull, pays off for hollow or concave shapes
+        self.stats = query_stats()
+        self.magnitude = float(np.abs(vertices).max(initial=0.0))  # for the float64 error bound
+        self.exact_tests = 0  # how often the filter was inconclusive, not thread safe, for benchmarks
+        for array in (tri32, origin, vertices, tri_vertex, child_ptr, child_idx, is_leaf, is_inside, node_ids):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_frozen(cls, frozen):
+        vertices, tri_vertex = np.unique(frozen.tri.reshape(-1, 2), axis=0, return_inverse=True)
+        tri_vertex = tri_vertex.reshape(-1, 3).astype(np.int32)
+        # centre on the polygon rather than the root triangle, the small triangles need the bits
+        inside = frozen.tri[frozen.is_inside].reshape(-1, 2)
+        origin = (inside.min(axis=0) + inside.max(axis=0)) / 2 if len(inside) else np.zeros(2)
+        tri32 = (frozen.tri - origin).astype(np.float32)
+        return cls(tri32, origin, vertices, tri_vertex, frozen.child_ptr.astype(np.int32),
+                   frozen.child_idx.astype(np.int32), frozen.is_leaf, frozen.is_inside,
+                   frozen.node_ids.astype(np.int32))
+
+    @property
+    def tri(self):
+        # every triangle's exact coordinates, a full float64 copy: hot paths use tri_rows
+        return self.vertices[self.tri_vertex]
+
+    def tri_rows(self, rows):
+        # exact coordinates of just these triangles, gathered from the vertex table; take is
+        # a good deal cheaper than fancy indexing on the small row sets of the leaf walks
+        return self.vertices.take(self.tri_vertex.take(rows, axis=0), axis=0)
+
+    def arrays(self):
+        return {'tri32': self.tri32, 'origin': self.origin, 'vertices': self.vertices,
+                'tri_vertex': self.tri_vertex, 'child_ptr': self.child_ptr, 'child_idx': self.child_idx,
+                'is_leaf': self.is_leaf, 'is_inside': self.is_inside, 'node_ids': self.node_ids}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data['tri32'], data['origin'], data['vertices'], data['tri_vertex'], data['child_ptr'],
+                   data['child_idx'], data['is_leaf'], data['is_inside'], data['node_ids'])
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def query_points(self, points):
+        q32 = (points - self.origin).astype(np.float32)
+        # float64 error bound as in FrozenIndex, for the calls too small for the float32 filter
+        magnitude = np.maximum(np.abs(points).max(axis=1), self.magnitude)
+        return points, q32, np.abs(q32).max(axis=1), STATIC * magnitude * magnitude
+
+    def inside(self, queries, which, nodes):
+        points, q32, magnitude, bound64 = queries
+        if len(which) < SMALL_BATCH:
+            return points_inside_triangles(points[which], self.tri_rows(nodes), bound64[which])
+        p = q32[which]
+        t = self.tri32[nodes]
+        px, py = p[:, 0], p[:, 1]
+        magnitude = magnitude[which]
+        signs = []  # -1, 0, 1 per edge
+        unsure = np.zeros(len(which), dtype=bool)
+        for a, b in ((t[:, 0], t[:, 1]), (t[:, 1], t[:, 2]), (t[:, 2], t[:, 0])):
+            dpx, dpy = px - b[:, 0], py - b[:, 1]
+            dax, day = a[:, 0] - b[:, 0], a[:, 1] - b[:, 1]
+            s = dpx * day
+            s -= dax * dpy
+            signs.append(np.sign(s))
+            # size = |dpx| + |dpy| + |dax| + |day|, in place, the operands aren't needed any more
+            size = np.abs(dpx, out=dpx)
+            size += np.abs(dpy, out=dpy)
+            size += np.abs(dax, out=dax)
+            size += np.abs(day, out=day)
+            # no coordinate in this test is further from the origin than |p| + size
+            e = size + magnitude
+            e *= np.float32(E)
+            bound = size * np.float32(4 * U32)
+            bound += 2 * e
+            bound *= size
+            bound += 8 * e * e
+            unsure |= np.abs(s, out=s) <= bound
+        hit = combine(*signs)
+        if unsure.any():
+            redo = np.flatnonzero(unsure)
+            self.exact_tests += len(redo)
+            hit[redo] = points_inside_triangles(points[which[redo]], self.tri_rows(nodes[redo]))
+        return hit
+
+if __name__ == "__main__":
+    """
+    BENCHMARK: CompactIndex vs FrozenIndex, same answers, memory and batch throughput, then
+    the leaf walking tools (rasterize, window queries, distances), which read exact triangles
+    """
+    import time
+    from kp import Kirkpatrick, generate_simple_polygon
+
+    np.random.seed(1)
+    for n in [1000, 10000, 50000]:
+        kp = Kirkpatrick(generate_simple_polygon(n), force_dag=True)
+        kp.preprocessing()
+        frozen = kp.freeze()
+        compact = CompactIndex.from_frozen(frozen)
+        frozen_bytes = sum(array.nbytes for array in frozen.arrays().values())
+        points = np.random.uniform(-1.2, 1.2, size=(200000, 2))
+        # plus points right on vertices and edge midpoints, where the filter has to give up
+        tri = frozen.tri[frozen.is_leaf]
+        on_edges = np.concatenate((tri[:, 0], (tri[:, 0] + tri[:, 1]) / 2))[:20000]
+        points = np.concatenate((points, on_edges))
+
+        start_time = time.perf_counter()
+        expected = frozen.locate_many(points)
+        frozen_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        got = compact.locate_many(points)
+        compact_time = time.perf_counter() - start_time
+        print(f"n={n:6d}  float64 {frozen_bytes / 1e6:6.1f} MB {frozen_time:.2f}s  "
+              f"float32 {compact.nbytes() / 1e6:6.1f} MB {compact_time:.2f}s  "
+              f"exact fallbacks {compact.exact_tests}  mismatches {(expected != got).sum()}")
+
+        def best(function, repeat=3):
+            timings = []
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                result = function()
+                timings.append(time.perf_counter() - start_time)
+            return min(timings), result
+
+        corners = np.random.uniform(-1.2, 1.2, size=(50, 2))
+        windows = [(x, y, x + 0.1, y + 0.1) for x, y in corners.tolist()]
+        tools = {"rasterize 1024^2": lambda index: index.rasterize(-1.2, -1.2, 2.4 / 1024, 2.4 / 1024, 1024, 1024),
+                 "50 windows": lambda index: [index.query_window(*box) for box in windows],
+                 "distance 20000": lambda index: index.distance_many(points[:20000])[0]}
+        for name, tool in tools.items():
+            frozen_time, expected = best(lambda: tool(frozen))
+            compact_time, got = best(lambda: tool(compact))
+            same = all(np.array_equal(a, b) for a, b in zip(expected, got))
+            print(f"          {name:17s} float64 {frozen_time:.3f}s  float32 {compact_time:.3f}s  same {same}")
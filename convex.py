@@ -0,0 +1,196 @@
+# convex.py
+"""
+Fast path for convex polygons: no triangulation, no DAG. The polygon is split
+into wedges (fans) around its first vertex; a query binary searches for its
+wedge and then tests the single outer edge of that wedge. O(log n) per point,
+build is one orientation pass over the vertices.
+"""
+import math
+import numpy as np
+from predicates import orient2d, orient2d_many, static_bound
+
+
+def cross(o, a, b):
+    # orientation of b relative to the line o -> a, positive when counter-clockwise; works on arrays
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+def convex_ring(points):
+    """
+    The polygon as a counter-clockwise ring without repeated or collinear vertices,
+    or None when the polygon is not strictly convex.
+    """
+    ring = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(ring) > 1 and (ring[0] == ring[-1]).all():
+        ring = ring[:-1]
+    # drop repeated and collinear vertices, they don't change the shape
+    ring = ring[(ring != np.roll(ring, -1, axis=0)).any(axis=1)]
+    if len(ring) < 3:
+        return None
+    prev, nxt = np.roll(ring, 1, axis=0), np.roll(ring, -1, axis=0)
+    flat = cross(prev, ring, nxt) == 0
+    if flat.any():
+        # a flat vertex that doubles back is a spike, not a straight edge
+        back = ((ring - prev) * (nxt - ring)).sum(axis=1) < 0
+        if (flat & back).any():
+            return None
+        ring = ring[~flat]
+        if len(ring) < 3:
+            return None
+    turns = cross(np.roll(ring, 1, axis=0), ring, np.roll(ring, -1, axis=0))
+    if (turns < 0).all():
+        ring = ring[::-1]
+    elif not (turns > 0).all():
+        return None
+    # all turns the same way can still wind around more than once
+    edges = np.roll(ring, -1, axis=0) - ring
+    angles = np.arctan2(edges[:, 1], edges[:, 0])
+    turning = np.diff(np.concatenate((angles, angles[:1])))
+    turning = (turning + np.pi) % (2 * np.pi) - np.pi
+    if abs(turning.sum() - 2 * np.pi) > 1e-6:
+        return None
+    return np.ascontiguousarray(ring)
+
+
+def is_convex(points):
+    return convex_ring(points) is not None
+
+
+def convex_hull(points):
+    # Andrew's monotone chain, counter-clockwise without collinear vertices
+    pts = np.unique(np.asarray(points, dtype=np.float64).reshape(-1, 2), axis=0)
+    if len(pts) < 3:
+        return pts
+
+    def chain(sequence):
+        out = []
+        for p in sequence:
+            while len(out) >= 2 and orient2d(out[-2], out[-1], p) <= 0:
+                out.pop()
+            out.append(tuple(p))
+        return out
+
+    lower, upper = chain(pts), chain(pts[::-1])
+    return np.array(lower[:-1] + upper[:-1])
+
+
+# FrozenIndex members the wedge search has no counterpart for, see ConvexIndex.as_frozen
+FROZEN_ONLY = {"candidates", "locate_leaves", "query_points", "inside", "tri", "tri_rows", "child_ptr", "child_idx",
+               "is_leaf", "is_inside", "node_ids", "bounds", "depth", "topological_order", "collapse", "query_window",
+               "clipped_inside_area", "leaf_neighbours", "boundary_edges", "distance_many", "distance",
+               "leaf_spans", "rasterize_block", "rasterize_tiles"}
+
+
+class ConvexIndex:
+    def __init__(self, ring):
+        self.ring = ring  # counter-clockwise, strictly convex, from convex_ring
+        self.ring.setflags(write=False)
+        self.ring_list = [tuple(p) for p in ring.tolist()]  # for scalar queries
+        self.extent = np.abs(ring).max(axis=0)  # largest |x| and |y|, all static_bound needs of the ring
+        self.box = (ring.min(axis=0), ring.max(axis=0))
+        self.stats = {"queries": 0, "bbox_rejected": 0, "hull_rejected": 0}  # as kp.query_stats()
+        self.frozen = None
+
+    def as_frozen(self):
+        # the same polygon as a FrozenIndex, for the DAG tools (windows, distances, collapse...);
+        # triangulates and builds the DAG on the first call, cached after that
+        if self.frozen is None:
+            from kp import Kirkpatrick
+            kp = Kirkpatrick(self.ring, force_dag=True)
+            kp.preprocessing()
+            self.frozen = kp.freeze()
+        return self.frozen
+
+    def __getattr__(self, name):
+        # only called for names the instance doesn't have
+        if name in FROZEN_ONLY:
+            raise AttributeError(f"ConvexIndex has no {name!r}, it is a FrozenIndex member: "
+                                 f"use as_frozen().{name}")
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @classmethod
+    def from_points(cls, points):
+        ring = convex_ring(points)
+        if ring is None:
+            raise ValueError("polygon is not convex")
+        return cls(ring)
+
+    def arrays(self):
+        return {'ring': self.ring}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(np.array(data['ring']))
+
+    def save(self, file):
+        np.savez(file, **self.arrays())
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file) as data:
+            return cls.from_arrays(data)
+
+    def locate_many(self, points, order=None):
+        # order is accepted for FrozenIndex compatibility, the search has no tree to be cache friendly with
+        q = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.stats["queries"] += len(q)
+        return self.contains_many(q)
+
+    def contains_many(self, q, edges=False):
+        # locate_many without counting the queries, for internal tests such as SnapCache's cell corners;
+        # edges=True also returns i per point, ring[i] -> ring[i + 1] being the outer edge of its wedge
+        # nan and infinite points are outside, and must not reach the exact fallback (no integer ratio)
+        finite = np.isfinite(q).all(axis=1)
+        if not finite.all():
+            q = np.where(finite[:, None], q, self.ring[0])
+        ring = self.ring
+        n = len(ring)
+        pivot = ring[0]
+        bound = static_bound(q, self.extent)
+        ends = np.broadcast_to(pivot, q.shape)
+        # outside the fan spanned by the edges leaving and entering the pivot
+        inside = (orient2d_many(ends, np.broadcast_to(ring[1], q.shape), q, bound) >= 0) & \
+                 (orient2d_many(ends, np.broadcast_to(ring[n - 1], q.shape), q, bound) <= 0)
+        # binary search the wedge: largest i with q left of pivot -> ring[i]
+        lo = np.ones(len(q), dtype=np.int64)
+        hi = np.full(len(q), n - 1, dtype=np.int64)
+        while True:
+            open_ = hi - lo > 1
+            if not open_.any():
+                break
+            mid = (lo + hi) // 2
+            left = cross(pivot, ring[mid], q) >= 0
+            lo = np.where(open_ & left, mid, lo)
+            hi = np.where(open_ & ~left, mid, hi)
+        # the wedge search may pick a neighbouring wedge for points right on a spoke, that
+        # doesn't change the answer; the outer edge test does, so it is exact
+        inside &= orient2d_many(ring[lo], ring[lo + 1], q, bound) >= 0
+        if edges:
+            return inside & finite, lo
+        return inside & finite
+
+    def locate(self, point):
+        # the same search in plain Python, a single point isn't worth the NumPy call overhead
+        if not (math.isfinite(point[0]) and math.isfinite(point[1])):
+            return False
+        ring = self.ring_list
+        n = len(ring)
+        pivot = ring[0]
+        if orient2d(pivot, ring[1], point) < 0 or orient2d(pivot, ring[n - 1], point) > 0:
+            return False
+        lo, hi = 1, n - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if orient2d(pivot, ring[mid], point) >= 0:
+                lo = mid
+            else:
+                hi = mid
+        return orient2d(ring[lo], ring[lo + 1], point) >= 0
+
+    def rasterize(self, x0, y0, dx, dy, width, height, tile=None, dtype=np.uint8):
+        xs = x0 + np.arange(width) * dx
+        mask = np.zeros((height, width), dtype=dtype)
+        for row in range(height):
+            points = np.column_stack((xs, np.full(width, y0 + row * dy)))
+            mask[row] = self.locate_many(points)
+        return mask
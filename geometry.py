@@ -0,0 +1,113 @@
+# geometry.py
+"""
+Geometric tests shared by the engine and the GUI panels. Plain Python and NumPy
+only, so importing the engine stays cheap.
+"""
+import numpy as np
+from predicates import orient2d, point_in_triangle, points_in_triangles
+
+
+def sign(p1, p2, p3):
+    return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
+
+
+def point_inside_triangle(pt, v1, v2, v3):
+    # closed and exact: a point on an edge shared by two triangles is found in the first one tried
+    return point_in_triangle(pt, v1, v2, v3)
+
+
+def points_inside_triangles(points, tri, bound=None):
+    # vectorized point_inside_triangle, points (n, 2) against triangles (n, 3, 2)
+    return points_in_triangles(points, tri, bound)
+
+
+def triangle_area(vertices):
+    a, b, c = vertices
+    return abs((b.x - a.x) * (c.y - a.y) - (c.x - a.x) * (b.y - a.y)) / 2.0
+
+
+def orientation(a, b, p):
+    # exact sign of the turn a -> b -> p
+    return orient2d(a, b, p)
+
+
+def triangles_overlap(triangle1, triangle2):
+    # True when the interiors share some area (what shapely's overlaps-or-contains gave us).
+    # Separating axis test on the triangle edges: a triangle that lies entirely on the
+    # far side of an edge, touching it at most, does not overlap.
+    t1 = [(v.x, v.y) for v in triangle1.vertices]
+    t2 = [(v.x, v.y) for v in triangle2.vertices]
+    for this, other in ((t1, t2), (t2, t1)):
+        for i in range(3):
+            a, b, c = this[i], this[(i + 1) % 3], this[(i + 2) % 3]
+            side = orientation(a, b, c)
+            if side == 0:
+                continue
+            if all(orientation(a, b, p) * side <= 0 for p in other):
+                return False
+    return True
+
+
+def triangles_intersect_box(tri, xmin, ymin, xmax, ymax):
+    # (n, 3, 2) triangles against one closed axis-aligned box, separating axis test on the
+    # box axes and the triangle edges; touching counts as intersecting
+    hit = ((tri[:, :, 0].min(axis=1) <= xmax) & (tri[:, :, 0].max(axis=1) >= xmin) &
+           (tri[:, :, 1].min(axis=1) <= ymax) & (tri[:, :, 1].max(axis=1) >= ymin))
+    corners = np.array([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)])
+    for i in range(3):
+        a, b, c = tri[:, i], tri[:, (i + 1) % 3], tri[:, (i + 2) % 3]
+        ex, ey = b[:, 0] - a[:, 0], b[:, 1] - a[:, 1]
+        side = ex * (c[:, 1] - a[:, 1]) - ey * (c[:, 0] - a[:, 0])
+        corner_sides = ex[:, None] * (corners[:, 1] - a[:, 1][:, None]) - ey[:, None] * (corners[:, 0] - a[:, 0][:, None])
+        # every corner strictly on the other side of this edge than the triangle
+        hit &= ~((corner_sides * side[:, None]) < 0).all(axis=1)
+    return hit
+
+
+def clip_to_box(polygon, xmin, ymin, xmax, ymax):
+    # Sutherland-Hodgman against the four sides of the box, polygon as a list of (x, y)
+    def clip(points, inside, cross):
+        out = []
+        for i, p in enumerate(points):
+            q = points[i - 1]
+            if inside(p):
+                if not inside(q):
+                    out.append(cross(q, p))
+                out.append(p)
+            elif inside(q):
+                out.append(cross(q, p))
+        return out
+
+    def at_x(x):
+        return lambda q, p: (x, q[1] + (p[1] - q[1]) * (x - q[0]) / (p[0] - q[0]))
+
+    def at_y(y):
+        return lambda q, p: (q[0] + (p[0] - q[0]) * (y - q[1]) / (p[1] - q[1]), y)
+
+    for inside, cross in ((lambda p: p[0] >= xmin, at_x(xmin)), (lambda p: p[0] <= xmax, at_x(xmax)),
+                          (lambda p: p[1] >= ymin, at_y(ymin)), (lambda p: p[1] <= ymax, at_y(ymax))):
+        polygon = clip(polygon, inside, cross)
+        if not polygon:
+            break
+    return polygon
+
+
+def polygon_area(polygon):
+    # shoelace, absolute value
+    area = 0.0
+    for i, (x, y) in enumerate(polygon):
+        px, py = polygon[i - 1]
+        area += px * y - x * py
+    return abs(area) / 2.0
+
+
+def points_segments_distance(points, a, b):
+    # distance from points[i] to the segment a[i] b[i], all (n, 2)
+    ab = b - a
+    ap = points - a
+    length = (ab * ab).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.clip((ap * ab).sum(axis=1) / length, 0.0, 1.0)
+    t[length == 0] = 0.0
+    closest = a + t[:, None] * ab
+    return np.hypot(points[:, 0] - closest[:, 0], points[:, 1] - closest[:, 1])
@@ -0,0 +1,159 @@
+# incremental.py
+"""
+Small polygon edits without a full rebuild.
+
+The built snapshot stays untouched. Every edit only changes the two edges next
+to one vertex, so the inside/outside answer can only flip inside the triangle
+formed by the neighbours and the old (or new) vertex position. Those triangles
+are kept in an overlay, and a query is answered as
+
+    inside = base answer XOR (number of overlay triangles strictly containing the point) % 2
+
+which is the crossing-number argument applied to the small loops the edits
+add. Once the overlay grows past `max_overlay` the current polygon is rebuilt
+in the background and the overlay entries covered by that build are dropped.
+"""
+import threading
+import time
+import numpy as np
+from snapshot import build_snapshot
+from predicates import exact_orient2d, static_bound
+
+
+def points_strictly_inside_triangles(points, tri):
+    # (n, 2) points against (m, 3, 2) triangles -> (n, m) bool
+    px = points[:, 0][:, None]
+    py = points[:, 1][:, None]
+    bound = static_bound(points, tri)[:, None]
+
+    def sign(a, b):
+        det = (px - b[:, 0]) * (a[:, 1] - b[:, 1]) - (a[:, 0] - b[:, 0]) * (py - b[:, 1])
+        # a point on an overlay edge must come out as exactly 0, or the parity is off
+        for i, j in zip(*np.nonzero(np.abs(det) <= bound)):
+            det[i, j] = exact_orient2d(a[j], b[j], points[i])
+        return det
+
+    d1 = sign(tri[:, 0], tri[:, 1])
+    d2 = sign(tri[:, 1], tri[:, 2])
+    d3 = sign(tri[:, 2], tri[:, 0])
+    return ((d1 > 0) & (d2 > 0) & (d3 > 0)) | ((d1 < 0) & (d2 < 0) & (d3 < 0))
+
+
+class IncrementalIndex:
+    def __init__(self, points, max_overlay=64):
+        self.points = [tuple(map(float, p)) for p in points]
+        self.max_overlay = max_overlay
+        # (snapshot, overlay triangles) is swapped as one tuple so readers never see half an update
+        self.state = (build_snapshot(self.points), np.empty((0, 3, 2)))
+        self.lock = threading.Lock()
+        self.merge_thread = None
+        self.merges = 0
+
+    # -- edits ----------------------------------------------------------------
+
+    def neighbours(self, i):
+        n = len(self.points)
+        return self.points[(i - 1) % n], self.points[(i + 1) % n]
+
+    def move_vertex(self, i, x, y):
+        with self.lock:
+            prev, nxt = self.neighbours(i)
+            old = self.points[i]
+            self.points[i] = (float(x), float(y))
+            self.add_overlay([(prev, old, nxt), (prev, self.points[i], nxt)])
+
+    def insert_vertex(self, i, x, y):
+        """Insert a new vertex before position i, between vertices i-1 and i."""
+        with self.lock:
+            n = len(self.points)
+            prev, nxt = self.points[(i - 1) % n], self.points[i % n]
+            self.points.insert(i, (float(x), float(y)))
+            self.add_overlay([(prev, self.points[i], nxt)])
+
+    def delete_vertex(self, i):
+        with self.lock:
+            if len(self.points) <= 3:
+                raise ValueError("a polygon needs at least 3 vertices")
+            prev, nxt = self.neighbours(i)
+            old = self.points.pop(i)
+            self.add_overlay([(prev, old, nxt)])
+
+    def add_overlay(self, triangles):
+        snapshot, overlay = self.state
+        overlay = np.concatenate([overlay, np.array(triangles, dtype=np.float64)])
+        self.state = (snapshot, overlay)
+        if len(overlay) > self.max_overlay and (self.merge_thread is None or not self.merge_thread.is_alive()):
+            self.merge_thread = threading.Thread(target=self.merge, name="kp-overlay-merge", daemon=True)
+            self.merge_thread.start()
+
+    def merge(self):
+        with self.lock:
+            points = list(self.points)
+            covered = len(self.state[1])
+        snapshot = build_snapshot(points)
+        with self.lock:
+            # edits made while building stay in the overlay
+            self.state = (snapshot, self.state[1][covered:])
+            self.merges += 1
+
+    def wait(self, timeout=None):
+        if self.merge_thread is not None:
+            self.merge_thread.join(timeout)
+
+    # -- queries --------------------------------------------------------------
+
+    def locate_many(self, points):
+        snapshot, overlay = self.state
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = snapshot.locate_many(points)
+        if len(overlay):
+            flips = points_strictly_inside_triangles(points, overlay).sum(axis=1) % 2 == 1
+            result = result ^ flips
+        return result
+
+    def locate(self, point):
+        return bool(self.locate_many([point])[0])
+
+
+"""
+    BENCHMARK: overlay queries vs a full rebuild
+"""
+
+if __name__ == "__main__":
+    from shapely.geometry import Polygon
+    import shapely
+    from kp import generate_simple_polygon
+
+    for n in [1000, 5000, 10000]:
+        points = generate_simple_polygon(n)
+        start_time = time.time()
+        index = IncrementalIndex(points, max_overlay=10 ** 9)
+        full_build = time.time() - start_time
+        queries = np.random.rand(20000, 2)
+
+        start_time = time.time()
+        index.locate_many(queries)
+        base_query = (time.time() - start_time) / len(queries)
+
+        # nudge random vertices, skipping moves that would make the polygon self-intersect
+        for edits in [1, 16, 64]:
+            while len(index.state[1]) < 2 * edits:
+                i = np.random.randint(len(index.points))
+                x, y = index.points[i] + np.random.uniform(-1e-3, 1e-3, 2)
+                moved = index.points[:i] + [(x, y)] + index.points[i + 1:]
+                if Polygon(moved).is_valid:
+                    index.move_vertex(i, x, y)
+            start_time = time.time()
+            result = index.locate_many(queries)
+            overlay_query = (time.time() - start_time) / len(queries)
+            expected = shapely.contains_xy(Polygon(index.points), queries[:, 0], queries[:, 1])
+            print(f"n={n:6d} edits={edits:3d}  full rebuild {full_build:.2f}s  "
+                  f"query base {base_query * 1e6:.2f}us  with overlay {overlay_query * 1e6:.2f}us  "
+                  f"mismatches {int((result != expected).sum())}")
+
+        start_time = time.time()
+        index.merge()
+        merged_query_start = time.time()
+        index.locate_many(queries)
+        print(f"n={n:6d} background merge {merged_query_start - start_time:.2f}s  "
+              f"query after merge {(time.time() - merged_query_start) / len(queries) * 1e6:.2f}us")
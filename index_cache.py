@@ -0,0 +1,142 @@
+# index_cache.py
+"""
+Content-addressed on-disk cache of built indexes.
+
+An entry's file name is a hash of the polygon coordinates and everything that
+changes the built structure (engine, degree bound, cache format version), so
+the same polygon built anywhere with the same parameters maps to the same
+file. Entries are written to a temporary file in the cache directory and
+moved into place with os.replace, so concurrent builders never see (or leave)
+a half written entry; when two race, the last rename wins with an identical
+file. Recency is the file's mtime, refreshed on every hit, and the least
+recently used entries are evicted once the directory grows past max_bytes.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import numpy as np
+from locators import ENGINES, Locator
+from loaders import Rings, from_array
+
+FORMAT_VERSION = 1
+SUFFIX = ".npz"
+
+
+def cache_key(points, engine="kirkpatrick", max_degree=12):
+    # points: one ring, or a loaders.Rings whose ring and polygon boundaries are part of the key
+    rings = points if isinstance(points, Rings) else from_array(points)
+    digest = hashlib.sha256()
+    digest.update(f"v{FORMAT_VERSION}:{engine}:{max_degree}:{len(rings.coords)}:".encode())
+    digest.update(rings.coords.tobytes())
+    if len(rings.ring_ptr) > 2:
+        digest.update(rings.ring_ptr.astype(np.int64).tobytes())
+        digest.update(rings.polygon_ptr.astype(np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class IndexCache:
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()  # guards the counters, the files take care of themselves
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                locator = Locator.load(file)
+        except FileNotFoundError:
+            self.count("misses")
+            return None
+        except Exception:
+            # unreadable entry (older format, truncated disk): drop it and rebuild
+            self.discard(path)
+            self.count("misses")
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass  # evicted by another process meanwhile, the loaded copy is still good
+        self.count("hits")
+        return locator
+
+    def put(self, key, locator):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                locator.save(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        self.count("writes")
+        self.evict()
+
+    def get_or_build(self, points, engine="kirkpatrick", max_degree=12):
+        key = cache_key(points, engine, max_degree)
+        locator = self.get(key)
+        if locator is None:
+            locator = ENGINES[engine]()
+            if engine == "kirkpatrick":
+                locator.max_degree = max_degree
+            locator = locator.build(points)
+            self.put(key, locator)
+        return locator
+
+    def entries(self):
+        # (mtime, size, path) of every finished entry, temporary files are skipped
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX) and not entry.name.startswith(".tmp-"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
+            self.count("evictions")
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self.discard(path)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes,
+                    "evictions": self.evictions, "bytes": self.size(),
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
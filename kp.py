@@ -1,11 +1,21 @@
+import itertools
 import numpy as np
-import time
-from shapely.geometry import Polygon, Point
 import triangle
-from panels.utils import point_inside_triangle, triangles_overlap
-import pandas as pd
-import matplotlib.pyplot as plt
+from geometry import point_inside_triangle, points_inside_triangles, triangle_area, triangles_overlap, \
+    triangles_intersect_box, clip_to_box, polygon_area, points_segments_distance
+from predicates import STATIC
+from convex import ConvexIndex, convex_ring, convex_hull
+from loaders import Rings, from_array
+
+# outer triangle margins as fractions of the polygon's extent: sides and base, and apex height
+OUTER_MARGIN = 0.1
+OUTER_APEX = 0.27
+
+
 class Vertex:
+    # one per polygon vertex for the whole build, slots keep the million-vertex case in memory
+    __slots__ = ("id", "x", "y", "degree", "adjacent_vertices", "triangles")
+
     def __init__(self, x, y, id):
         self.id = id  # vertice of outer triangle have ids 0, 1, 2, each user created vertex id starts from 3
         self.x = x
@@ -13,6 +23,9 @@ class Vertex:
         self.degree = 0
         self.adjacent_vertices = set()
         self.triangles = set()
+
+    def get_coordinates(self):
+        return (self.x, self.y)
         
     def add_adjacent_vertex(self, vertex):
         self.adjacent_vertices.add(vertex)
@@ -28,34 +41,60 @@ class Vertex:
         self.triangles.clear()
 
 class TriangleNode:
-    _id_counter = 0
-    def __init__(self, vertices, is_inside=False, is_leaf=False, is_root=False):
-        TriangleNode._id_counter += 1
-        self.id = TriangleNode._id_counter
+    __slots__ = ("id", "vertices", "is_inside", "is_leaf", "is_active", "is_root", "children", "ordered_children")
+    def __init__(self, vertices, id, is_inside=False, is_leaf=False, is_root=False):
+        self.id = id  # unique within one build, from Kirkpatrick.triangle_ids
         self.vertices = vertices  # The vertices of the triangle
         self.is_inside = is_inside  # True if the triangle is part of the inner polygon
         self.is_leaf = is_leaf
         self.is_active = True
         self.is_root = is_root
-        self.children = set()  # Children in the DAG
+        self.children = []  # Children in the DAG, a list: leaves (half the nodes) have none and empty sets are big
+        self.ordered_children = None  # children sorted by hit probability, see Kirkpatrick.train_child_order
         
         # Update vertices' triangles
         for vertex in self.vertices:
             vertex.add_triangle(self)
     
     def add_child(self, child):
-        self.children.add(child)
+        self.children.append(child)
     
+    def get_children(self):
+        return self.ordered_children or self.children
+
     def clear(self):
         self.vertices = []
         self.children.clear()
+        self.ordered_children = None
+
+
+class BuildStep:
+    """
+    One event from Kirkpatrick.build_steps().
+    kind is "triangulated" (added holds the leaf triangles), "independent_set"
+    (the vertices about to be removed) or "removed" (the triangles that left and
+    joined the active triangulation at this level).
+    """
+    def __init__(self, kind, level, independent_set=(), removed=(), added=(), num_active=0):
+        self.kind = kind
+        self.level = level
+        self.independent_set = independent_set
+        self.removed = removed
+        self.added = added
+        self.num_active = num_active  # size of the active triangulation after this step
 
 
 class Kirkpatrick:
-    def __init__(self, points):
-        self.vertices = {}
-        for i, p in enumerate(points):
-            self.vertices[i+3] = Vertex(*p, i+3)
+    def __init__(self, points, force_dag=False, max_degree=12):
+        # points: one ring as an (n, 2) array or sequence of pairs, or a loaders.Rings (holes, multipolygons)
+        self.rings = points if isinstance(points, Rings) else from_array(points)
+        coords = self.rings.coords
+        # convex input is answered by a wedge search instead of the DAG unless force_dag is set
+        single = len(self.rings.ring_ptr) == 2
+        ring = None if force_dag or not single else convex_ring(coords)
+        self.convex = ConvexIndex(ring) if ring is not None else None
+        self.vertices = dict(zip(range(3, len(coords) + 3), map(Vertex, coords[:, 0].tolist(),
+                                                                  coords[:, 1].tolist(), range(3, len(coords) + 3))))
         self.triangles = []
         self.root = None  # Root of the DAG
         self.outer_triangle = None # outer bounding triangle vertices
@@ -64,11 +103,27 @@ class Kirkpatrick:
         self.newly_removed_triangles_list = []
         self.newly_added_triangles_list = []
         self.indep_set = set()
+        self.frozen = None
+        self.triangle_ids = itertools.count(1)  # TriangleNode ids, restarted by build_steps
+        self.search_path = []
+        # O(1) rejection before the DAG: the polygon's bounding box, then its convex hull
+        # (the build removes vertices from self.vertices, so keep the input coordinates)
+        self.polygon = coords
+        self.bounds = None
+        if len(self.polygon):
+            self.bounds = (tuple(self.polygon.min(axis=0)), tuple(self.polygon.max(axis=0)))
+        self.use_hull = False  # set to also test the convex hull, pays off for hollow or concave shapes
+        self.hull = None  # ConvexIndex of the hull, built on first use
+        self.stats = query_stats()
+        self.max_degree = max_degree  # only vertices below this degree go into an independent set
  
         
     def construct_outer_triangle(self):
-        # Convert vertices to a NumPy array for easier manipulation
-        vertices = np.array([(vertex.x, vertex.y) for vertex in self.vertices.values()])
+        vertices = self.rings.coords
+        # margins relative to the polygon's size, so the triangle hugs unit-scale data as
+        # closely as pixel-scale data (where these come out near the old 30 and 80 pixels)
+        extent = max(np.ptp(vertices[:, 0]), np.ptp(vertices[:, 1])) or 1.0
+        pad = OUTER_MARGIN * extent
 
         # Find the indices of the top and bottom vertices
         top_index = np.argmax(vertices[:, 1])
@@ -76,7 +131,7 @@ class Kirkpatrick:
 
         # Determine the top vertex and its coordinates
         top_vertex = vertices[top_index]
-        top_x, top_y = top_vertex[0], top_vertex[1] + 80
+        top_x, top_y = top_vertex[0], top_vertex[1] + OUTER_APEX * extent
 
         # Calculate angles of vertices with respect to the top vertex
         angles = np.arctan2(vertices[:, 1] - top_y, vertices[:, 0] - top_x)
@@ -91,67 +146,115 @@ class Kirkpatrick:
         right_vertex = vertices[right_index]
 
         # Calculate slopes of the left and right sides of the outer triangle
-        slope_l = (left_vertex[0] - 30 - top_x) / (top_y - left_vertex[1])
-        slope_r = (right_vertex[0] + 30 - top_x) / (top_y - right_vertex[1])
+        slope_l = (left_vertex[0] - pad - top_x) / (top_y - left_vertex[1])
+        slope_r = (right_vertex[0] + pad - top_x) / (top_y - right_vertex[1])
 
         # Calculate coordinates of the left and right vertices
-        left_x = int(top_x + slope_l * (top_y - vertices[bottom_index][1] + 30))
-        left_y = vertices[bottom_index][1] - 30
-        right_x = int(top_x + slope_r * (top_y - vertices[bottom_index][1] + 30))
-        right_y = vertices[bottom_index][1] - 30
+        left_x = top_x + slope_l * (top_y - vertices[bottom_index][1] + pad)
+        left_y = vertices[bottom_index][1] - pad
+        right_x = top_x + slope_r * (top_y - vertices[bottom_index][1] + pad)
+        right_y = vertices[bottom_index][1] - pad
 
         # Create the outer triangle as a list of tuples
         self.outer_triangle = [Vertex(top_x, top_y, 0), Vertex(left_x, left_y, 1), Vertex(right_x, right_y, 2)]
         # self.create_polygon([x for point in self.outer_triangle for x in point], fill="", outline="red")
         
-    def triangulate_inside_polygon(self):
-  
-        num_vertices = len(self.vertices)
-        vertices_list = list(self.vertices.values())
-        vertices_array = np.array([[vertex.x, vertex.y] for vertex in vertices_list])
-        hole_poly = {
-            'vertices': vertices_array,
-            'segments': [[i, (i + 1) % num_vertices] for i in range(num_vertices)], 
-        }
-        inner_triangulated = triangle.triangulate(hole_poly, 'p')
-        
-        self.process_triangulation_results(vertices_list, inner_triangulated, is_inside=True, is_leaf=True)
-        
-    def triangulate_outer_triangle(self):
-        all_vertices  = self.outer_triangle + list(self.vertices.values())
-        vertices_array = np.array([(vertex.x, vertex.y) for vertex in all_vertices])
-        outer_segments = [[i, i + 1] for i in range(len(self.outer_triangle) - 1)] + [[len(self.outer_triangle) - 1, 0]]
-        inner_segments_start_index = len(self.outer_triangle)
-        inner_segments = [[i + inner_segments_start_index, i + 1 + inner_segments_start_index] for i in range(len(self.vertices.keys()) - 1)] + [[inner_segments_start_index + len(self.vertices.keys()) - 1, inner_segments_start_index]]
-        
-        hole_point = [self.calculate_centroid(list(self.active_triangles.values())[0].vertices)]
-        hole_poly = {
-            'vertices': vertices_array,
-            'segments': outer_segments + inner_segments,
-            'holes': hole_point
-        }
-        triangulated = triangle.triangulate(hole_poly, 'p')
-        self.process_triangulation_results(all_vertices, triangulated, is_inside=False, is_leaf=True)
+    def ring_segments(self, offset=0):
+        # (n, 2) vertex index pairs closing every ring, shifted by offset
+        ring_ptr = self.rings.ring_ptr
+        start = np.arange(ring_ptr[-1])
+        end = start + 1
+        end[ring_ptr[1:] - 1] = ring_ptr[:-1]
+        return np.column_stack((start, end)) + offset
+
+    def triangulate_leaves(self):
+        # one constrained triangulation of the outer triangle and every ring, split into inside and
+        # outside leaves afterwards, so holes and multipolygons need no seed points
+        coords = self.rings.coords
+        all_vertices = self.outer_triangle + list(self.vertices.values())
+        vertices_array = np.concatenate(([(vertex.x, vertex.y) for vertex in self.outer_triangle], coords))
+        segments = np.concatenate(([[0, 1], [1, 2], [2, 0]], self.ring_segments(offset=len(self.outer_triangle))))
+        triangulated = triangle.triangulate({'vertices': vertices_array, 'segments': segments}, 'pn')
+        triangles = triangulated['triangles']
+        inside = self.inside_parity(triangles, triangulated['neighbors'], segments, len(vertices_array))
+
+        self.process_triangulation_results(all_vertices, {'triangles': triangles[inside]}, is_inside=True, is_leaf=True)
+        leaves = self.newly_added_triangles_list
+        self.process_triangulation_results(all_vertices, {'triangles': triangles[~inside]}, is_inside=False, is_leaf=True)
+        self.newly_added_triangles_list = leaves + self.newly_added_triangles_list
+
+    def inside_parity(self, triangles, neighbours, segments, num_vertices):
+        # even-odd rule: triangles joined by an edge that isn't on a ring share a side, crossing a ring
+        # edge flips it; edge k of a triangle is the one opposite its vertex k
+        first = triangles[:, [1, 2, 0]].astype(np.int64)  # the keys overflow int32
+        second = triangles[:, [2, 0, 1]].astype(np.int64)
+        keys = np.minimum(first, second) * num_vertices + np.maximum(first, second)
+        segments = segments.astype(np.int64)
+        ring_keys = np.minimum(segments[:, 0], segments[:, 1]) * num_vertices + segments.max(axis=1)
+        crossing = np.isin(keys, ring_keys).ravel()
+        t = np.repeat(np.arange(len(triangles)), 3)
+        neighbour = neighbours.ravel().astype(np.int64)
+        pair = neighbour > t  # each adjacency once, no -1 (hull edges)
+
+        # regions between ring edges: union-find over all triangles at once, hooking roots onto
+        # smaller roots and then jumping every pointer to its root
+        region = np.arange(len(triangles))
+        a, b = t[pair & ~crossing], neighbour[pair & ~crossing]
+        while len(a):
+            ra, rb = region[a], region[b]
+            differ = ra != rb
+            a, b, ra, rb = a[differ], b[differ], ra[differ], rb[differ]
+            np.minimum.at(region, np.maximum(ra, rb), np.minimum(ra, rb))
+            while True:
+                root = region[region]
+                if np.array_equal(root, region):
+                    break
+                region = root
+
+        # few regions: walk them from the one holding a corner of the outer triangle, flipping per ring
+        a, b = region[t[pair & crossing]], region[neighbour[pair & crossing]]
+        adjacent = {}
+        for u, v in set(zip(a.tolist(), b.tolist())):
+            adjacent.setdefault(u, []).append(v)
+            adjacent.setdefault(v, []).append(u)
+        start = int(region[np.flatnonzero((triangles == 0).any(axis=1))[0]])
+        odd = {start: False}
+        stack = [start]
+        while stack:
+            u = stack.pop()
+            for v in adjacent.get(u, ()):
+                if v not in odd:
+                    odd[v] = not odd[u]
+                    stack.append(v)
+        roots = np.array(list(odd), dtype=np.int64)
+        inside = np.zeros(len(triangles), dtype=bool)
+        inside[roots[np.array(list(odd.values()), dtype=bool)]] = True
+        return inside[region]
 
-        
     def process_triangulation_results(self, vertices, triangulated, is_inside, is_leaf):
         new_triangles = {}
+        touched = set()
 
         # Iterate over the triangulation results to create TriangleNodes
-        for tri_indices in triangulated['triangles']:
-            tri_vertices = [vertices[i] for i in tri_indices]
-                
-            new_triangle = TriangleNode(tri_vertices, is_inside=is_inside, is_leaf=is_leaf)
+        for i, j, k in triangulated['triangles'].tolist():
+            a, b, c = vertices[i], vertices[j], vertices[k]
+            # the node registers itself with its vertices
+            new_triangle = TriangleNode([a, b, c], next(self.triangle_ids), is_inside=is_inside, is_leaf=is_leaf)
             new_triangles[new_triangle.id] = new_triangle
-            # Update vertex's adjacent set and triangle associations
-            for vertex in tri_vertices:
-                vertex.add_triangle(new_triangle)
-                for adj_vertex in tri_vertices:
-                    if vertex != adj_vertex:
-                        vertex.add_adjacent_vertex(adj_vertex)
+            # each edge once per triangle, degrees once at the end
+            a.adjacent_vertices.add(b)
+            a.adjacent_vertices.add(c)
+            b.adjacent_vertices.add(a)
+            b.adjacent_vertices.add(c)
+            c.adjacent_vertices.add(a)
+            c.adjacent_vertices.add(b)
+            touched.update((a, b, c))
+        for vertex in touched:
+            vertex.degree = len(vertex.adjacent_vertices)
 
         # Update the active_triangles dictionary
         self.active_triangles.update(new_triangles)
+        self.all_triangles.update(new_triangles)
         self.newly_added_triangles_list = list(new_triangles.values())
         
     def calculate_centroid(self, vertices):
@@ -165,7 +268,7 @@ class Kirkpatrick:
         considered = set()  # Keep track of vertices id marked as considered
         
         for vertex in self.vertices.values():
-            if not vertex.id in considered and vertex.degree < 12:
+            if not vertex.id in considered and vertex.degree < self.max_degree:
                 independent_set.add(vertex)
                 considered.add(vertex.id)  # Mark this vertex as considered
                 # mark all adjacent vertices as considered to prevent their addition
@@ -174,6 +277,9 @@ class Kirkpatrick:
         return independent_set     
 
     def remove_independent_set(self, independent_set):
+        # returns every triangle removed and added at this level
+        removed_triangles = []
+        added_triangles = []
         for vertex in independent_set:
             # Remove from self.vertices list
             self.vertices.pop(vertex.id)
@@ -191,7 +297,10 @@ class Kirkpatrick:
                         tri_vertex.triangles.discard(triangle)
             self.retriangulate(vertex, adjacent_vertices_list)
             # build DAG search tree
-            self.update_triangle_children()     
+            self.update_triangle_children()
+            removed_triangles.extend(self.newly_removed_triangles_list)
+            added_triangles.extend(self.newly_added_triangles_list)
+        return removed_triangles, added_triangles
 
    # make sure vertices form a simple polygon (sort the vertices by their angle using the atan2)
     def sort_vertices(self, vertex, vertices):
@@ -227,30 +336,78 @@ class Kirkpatrick:
             vertex.clear()
         for triangle in self.active_triangles.values():
             triangle.clear()
-        TriangleNode._id_counter = 0
         self.vertices.clear()
         self.outer_triangle=None
         self.newly_removed_triangles_list.clear()
         self.newly_added_triangles_list.clear()
         self.indep_set.clear()
         self.active_triangles.clear() 
+        self.all_triangles.clear()
+        self.root = None
+        self.frozen = None
 
-    def preprocessing(self):
+    def build_steps(self):
+        """Run the construction one stage at a time, yielding a BuildStep after each."""
+        self.root = None
+        self.frozen = None
+        # a counter per build, so concurrent builds (LiveIndex, IncrementalIndex merges) can't hand out the same id
+        self.triangle_ids = itertools.count(1)
         self.construct_outer_triangle()
-        self.triangulate_inside_polygon()
-        self.triangulate_outer_triangle()
+        self.triangulate_leaves()
+        leaves = self.newly_added_triangles_list
+        level = 0
+        yield BuildStep("triangulated", level, added=leaves, num_active=len(self.active_triangles))
         while len(self.active_triangles) > 1:
+            level += 1
             self.indep_set = self.find_independent_set()
-            self.remove_independent_set(self.indep_set)
+            yield BuildStep("independent_set", level, independent_set=self.indep_set,
+                            num_active=len(self.active_triangles))
+            removed, added = self.remove_independent_set(self.indep_set)
+            if len(self.active_triangles) == 1:
+                self.root = list(self.active_triangles.values())[0]
+            yield BuildStep("removed", level, independent_set=self.indep_set, removed=removed, added=added,
+                            num_active=len(self.active_triangles))
+
+    def preprocessing(self):
+        if self.convex is not None:
+            # nothing to build, the wedge search works straight off the vertex ring
+            return
+        for _ in self.build_steps():
+            pass
         self.root = list(self.active_triangles.values())[0]
         
+    def reject(self, point):
+        # True when the point is certainly outside, without touching the DAG
+        self.stats["queries"] += 1
+        if self.bounds is None:
+            return False
+        (xmin, ymin), (xmax, ymax) = self.bounds
+        if not (xmin <= point[0] <= xmax and ymin <= point[1] <= ymax):
+            self.stats["bbox_rejected"] += 1
+            return True
+        if self.use_hull and self.convex is None:
+            if self.hull is None:
+                self.hull = ConvexIndex(convex_hull(self.polygon))
+            if not self.hull.locate(point):
+                self.stats["hull_rejected"] += 1
+                return True
+        return False
+
     def point_location(self, point):
+        if self.reject(point):
+            self.search_path = []
+            self.is_inside = False
+            return False
+        if self.convex is not None:
+            self.is_inside = self.convex.locate(point)
+            return self.is_inside
         search_path = []
+        self.search_path = search_path
         traveler = self.root
         while not traveler.is_leaf:
             search_path.append(traveler)
             found = False
-            for child in traveler.children:
+            for child in traveler.get_children():
                 v1, v2, v3 = [(v.x, v.y) for v in child.vertices]
                 if point_inside_triangle(point, v1, v2, v3):
                     traveler = child
@@ -270,6 +427,667 @@ class Kirkpatrick:
             self.is_inside = False
             return False 
 
+    def build_dag(self):
+        # convex input skips the DAG in preprocessing; the tools that walk it build it here
+        if self.root is None:
+            for _ in self.build_steps():
+                pass
+            self.root = list(self.active_triangles.values())[0]
+
+    def dag_nodes(self):
+        self.build_dag()
+        nodes = [self.root]
+        seen = {self.root.id}
+        for node in nodes:
+            for child in node.children:
+                if child.id not in seen:
+                    seen.add(child.id)
+                    nodes.append(child)
+        return nodes
+
+    def count_child_tests(self, points):
+        # average number of point_inside_triangle calls spent on children per query
+        self.build_dag()
+        tests = 0
+        for point in points:
+            traveler = self.root
+            while not traveler.is_leaf:
+                found = False
+                for child in traveler.get_children():
+                    tests += 1
+                    v1, v2, v3 = [(v.x, v.y) for v in child.vertices]
+                    if point_inside_triangle(point, v1, v2, v3):
+                        traveler = child
+                        found = True
+                        break
+                if not found:
+                    break
+        return tests / max(len(points), 1)
+
+    def train_child_order(self, sample_points=None, prior_weight=1.0, holdout=0.25):
+        """
+        Reorder every node's children so the likeliest child is tested first.
+        Hits are counted per parent -> child edge from running sample_points through
+        the DAG, so a child shared by several parents is ranked under each by the
+        queries that came through that parent; child area (a uniform query prior)
+        breaks ties and orders nodes the sample never reached.
+        Returns the expected child tests per query before and after, measured on
+        points the order wasn't trained on: the last `holdout` fraction of
+        sample_points, or uniform points over the outer triangle without a sample.
+        """
+        self.build_dag()
+        if sample_points is None:
+            training = []
+            low, high = self.outer_bounds()
+            evaluation = np.random.uniform(low, high, size=(1000, 2))
+        else:
+            sample_points = list(sample_points)
+            split = len(sample_points) - max(1, int(len(sample_points) * holdout))
+            training, evaluation = sample_points[:split], sample_points[split:]
+        before = self.count_child_tests(evaluation)
+
+        hits = {}  # (parent id, child id) -> queries that went down that edge
+        for point in training:
+            traveler = self.root
+            while not traveler.is_leaf:
+                for child in traveler.get_children():
+                    v1, v2, v3 = [(v.x, v.y) for v in child.vertices]
+                    if point_inside_triangle(point, v1, v2, v3):
+                        edge = (traveler.id, child.id)
+                        hits[edge] = hits.get(edge, 0) + 1
+                        traveler = child
+                        break
+                else:
+                    break
+
+        for node in self.dag_nodes():
+            if not node.children:
+                continue
+            areas = {child.id: triangle_area(child.vertices) for child in node.children}
+            total_area = sum(areas.values()) or 1.0
+            node.ordered_children = sorted(
+                node.children,
+                key=lambda child: hits.get((node.id, child.id), 0) + prior_weight * areas[child.id] / total_area,
+                reverse=True)
+        self.frozen = None
+
+        after = self.count_child_tests(evaluation)
+        return before, after
+
+    def outer_bounds(self):
+        self.build_dag()
+        coords = np.array([(v.x, v.y) for v in self.root.vertices])
+        return coords.min(axis=0), coords.max(axis=0)
+
+    def freeze(self, compact=False):
+        # flatten the DAG into arrays so many points can be located at once;
+        # compact=True stores it as float32, see compact.CompactIndex
+        if self.convex is not None:
+            return self.convex
+        frozen = FrozenIndex.from_root(self.root)
+        if compact:
+            from compact import CompactIndex
+            return CompactIndex.from_frozen(frozen)
+        return frozen
+
+    def point_location_batch(self, points, order=None):
+        if self.frozen is None:
+            self.frozen = self.freeze()
+        return self.frozen.locate_many(points, order=order)
+
+    def rasterize(self, x0, y0, dx, dy, width, height, tile=None, dtype=np.uint8):
+        if self.frozen is None:
+            self.frozen = self.freeze()
+        return self.frozen.rasterize(x0, y0, dx, dy, width, height, tile=tile, dtype=dtype)
+
+
+def query_stats():
+    # queries seen, and how many of them were answered "outside" before reaching the DAG
+    return {"queries": 0, "bbox_rejected": 0, "hull_rejected": 0}
+
+
+def rejection_rates(stats):
+    queries = stats["queries"] or 1
+    return {"bbox": stats["bbox_rejected"] / queries, "hull": stats["hull_rejected"] / queries,
+            "total": (stats["bbox_rejected"] + stats["hull_rejected"]) / queries}
+
+
+def grid_coordinates(points, bounds, bits):
+    # map points into integer cells of a 2**bits grid over the bounding box of `bounds`
+    lo = bounds.min(axis=0)
+    span = np.maximum(bounds.max(axis=0) - lo, np.finfo(np.float64).tiny)
+    cells = (points - lo) / span * ((1 << bits) - 1)
+    cells = np.clip(cells, 0, (1 << bits) - 1).astype(np.int64)
+    return cells[:, 0], cells[:, 1]
+
+
+# spreading the low 32 bits of a uint64 out to the even bits, one halving of the gap per step
+MORTON_STEPS = ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                (2, 0x3333333333333333), (1, 0x5555555555555555))
+
+
+def morton_keys(x, y, bits=16):
+    # interleave the low `bits` bits of x (even bits) and y (odd bits), as uint64
+    if not 1 <= bits <= 32:
+        raise ValueError(f"morton keys hold 1 to 32 bits per coordinate, not {bits}")
+
+    def spread(v):
+        v = v.astype(np.uint64) & np.uint64((1 << bits) - 1)
+        for shift, mask in MORTON_STEPS:
+            v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+
+    return spread(x) | (spread(y) << np.uint64(1))
+
+
+def hilbert_keys(x, y, bits=16):
+    # int64 keys, up to 4**bits - 1
+    if not 1 <= bits <= 31:
+        raise ValueError(f"hilbert keys hold 1 to 31 bits per coordinate, not {bits}")
+    n = 1 << bits
+    x = x.copy()
+    y = y.copy()
+    d = np.zeros_like(x)
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return d
+
+
+def curve_order(points, bounds, order='hilbert', bits=16):
+    x, y = grid_coordinates(points, bounds, bits)
+    if order == 'hilbert':
+        keys = hilbert_keys(x, y, bits)
+    elif order == 'morton':
+        keys = morton_keys(x, y, bits)
+    else:
+        raise ValueError(f"unknown curve order: {order}")
+    return np.argsort(keys, kind='stable')
+
+
+class FrozenIndex:
+    """Read-only array form of the DAG, node 0 is the root."""
+    def __init__(self, tri, child_ptr, child_idx, is_leaf, is_inside, node_ids):
+        self.tri = tri  # (n, 3, 2) triangle coordinates
+        self.child_ptr = child_ptr  # children of node i are child_idx[child_ptr[i]:child_ptr[i+1]]
+        self.child_idx = child_idx
+        self.is_leaf = is_leaf
+        self.is_inside = is_inside
+        self.node_ids = node_ids  # TriangleNode ids, for mapping results back to the DAG
+        self.root_id = int(node_ids[0])
+        self.neighbours = None  # leaf adjacency, built on first rasterize
+        self.magnitude = None  # largest coordinate, for the predicate error bound
+        self.boundary = None  # polygon edges among the leaf edges, built on first distance query
+        self.bounds = None  # polygon bounding box and hull for rejecting far points, see candidates()
+        self.hull = None
+        self.use_hull = False  # set to also test the convex hull, pays off for hollow or concave shapes
+        self.stats = query_stats()  # counters are best effort when threads share the index
+        # snapshots are shared between threads, nothing may write to them after the build
+        for array in (tri, child_ptr, child_idx, is_leaf, is_inside, node_ids):
+            array.setflags(write=False)
+
+    def arrays(self):
+        return {'tri': self.tri, 'child_ptr': self.child_ptr, 'child_idx': self.child_idx,
+                'is_leaf': self.is_leaf, 'is_inside': self.is_inside, 'node_ids': self.node_ids}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data['tri'], data['child_ptr'], data['child_idx'],
+                   data['is_leaf'], data['is_inside'], data['node_ids'])
+
+    def save(self, file):
+        # file is a path or an open binary file, as for np.savez
+        np.savez(file, **self.arrays())
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file) as data:
+            return cls.from_arrays(data)
+
+    @classmethod
+    def from_root(cls, root):
+        order = {root.id: 0}
+        nodes = [root]
+        i = 0
+        while i < len(nodes):
+            for child in nodes[i].get_children():
+                if child.id not in order:
+                    order[child.id] = len(nodes)
+                    nodes.append(child)
+            i += 1
+
+        tri = np.array([[(v.x, v.y) for v in node.vertices] for node in nodes], dtype=np.float64)
+        counts = np.array([len(node.children) for node in nodes], dtype=np.int64)
+        child_ptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=child_ptr[1:])
+        child_idx = np.array([order[child.id] for node in nodes for child in node.get_children()], dtype=np.int64)
+        is_leaf = np.array([node.is_leaf for node in nodes], dtype=bool)
+        is_inside = np.array([node.is_inside for node in nodes], dtype=bool)
+        node_ids = np.array([node.id for node in nodes], dtype=np.int64)
+        return cls(tri, child_ptr, child_idx, is_leaf, is_inside, node_ids)
+
+    def depth(self):
+        # number of triangle tests on the longest root to leaf path
+        depth = np.zeros(len(self.is_leaf), dtype=np.int64)
+        for node in reversed(self.topological_order()):
+            children = self.child_idx[self.child_ptr[node]:self.child_ptr[node + 1]]
+            depth[node] = 1 + (depth[children].max() if len(children) else 0)
+        return int(depth[0])
+
+    def topological_order(self):
+        # parents before children (reverse DFS post-order from the root)
+        order, seen, stack = [], {0}, [(0, iter(self.child_idx[self.child_ptr[0]:self.child_ptr[1]].tolist()))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(self.child_idx[self.child_ptr[child]:self.child_ptr[child + 1]].tolist())))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+        return order[::-1]
+
+    def collapse(self, max_fanout=8):
+        """
+        Shorter DAG with the same answers. Working from the leaves up, a child with a single
+        child is replaced by that child (it covers the parent's child completely), and a
+        node's children are replaced by its grandchildren as long as there are at most
+        max_fanout of them. Every point in a node is in one of its new children and every
+        subtree still locates anything inside its own triangle, so leaves found don't change
+        except, possibly, for points exactly on a shared edge.
+        """
+        children = {}
+        for node in reversed(self.topological_order()):
+            if self.is_leaf[node]:
+                continue
+            current = self.child_idx[self.child_ptr[node]:self.child_ptr[node + 1]].tolist()
+            # collapse single child chains (the chains below are already collapsed)
+            current = [child if self.is_leaf[child] or len(children[child]) != 1 else children[child][0]
+                       for child in current]
+            while True:
+                wider = list(dict.fromkeys(
+                    grandchild for child in current
+                    for grandchild in ([child] if self.is_leaf[child] else children[child])))
+                if wider == current or len(wider) > max_fanout:
+                    break
+                current = wider
+            children[node] = current
+
+        # keep only what the root can still reach, in BFS order like from_root
+        order = {0: 0}
+        nodes = [0]
+        for node in nodes:
+            for child in children.get(node, ()):
+                if child not in order:
+                    order[child] = len(nodes)
+                    nodes.append(child)
+        nodes = np.array(nodes, dtype=np.int64)
+        counts = np.array([len(children.get(node, ())) for node in nodes.tolist()], dtype=np.int64)
+        child_ptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=child_ptr[1:])
+        child_idx = np.array([order[child] for node in nodes.tolist() for child in children.get(node, ())],
+                             dtype=np.int64)
+        return FrozenIndex(self.tri_rows(nodes), child_ptr, child_idx, self.is_leaf[nodes].copy(),
+                           self.is_inside[nodes].copy(), self.node_ids[nodes].astype(np.int64))
+
+    def locate_leaves(self, points):
+        # index of the leaf containing each point, -1 when no child matched
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(points)
+        queries = self.query_points(points)
+        current = np.zeros(n, dtype=np.int64)
+        leaves = np.full(n, -1, dtype=np.int64)
+        alive = np.arange(n)
+        while alive.size:
+            nodes = current[alive]
+            at_leaf = self.is_leaf[nodes]
+            if at_leaf.any():
+                done = alive[at_leaf]
+                hit = self.inside(queries, done, current[done])
+                leaves[done[hit]] = current[done[hit]]
+                alive = alive[~at_leaf]
+                nodes = nodes[~at_leaf]
+                if not alive.size:
+                    break
+
+            # test the k-th child of every still-descending point, like the scalar loop
+            start = self.child_ptr[nodes]
+            count = self.child_ptr[nodes + 1] - start
+            nxt = np.full(len(alive), -1, dtype=np.int64)
+            pending = np.arange(len(alive))
+            k = 0
+            while pending.size:
+                pending = pending[count[pending] > k]
+                if not pending.size:
+                    break
+                child = self.child_idx[start[pending] + k]
+                hit = self.inside(queries, alive[pending], child)
+                nxt[pending[hit]] = child[hit]
+                pending = pending[~hit]
+                k += 1
+            found = nxt >= 0
+            current[alive[found]] = nxt[found]
+            alive = alive[found]
+        return leaves
+
+    def query_points(self, points):
+        # whatever inside() needs about the queries, computed once per batch: here the
+        # points and the error bound of their orientation tests against any triangle
+        if self.magnitude is None:
+            self.magnitude = np.abs(self.tri).max()
+        magnitude = np.maximum(np.abs(points).max(axis=1), self.magnitude)
+        return points, STATIC * magnitude * magnitude
+
+    def tri_rows(self, rows):
+        # (len(rows), 3, 2) float64 coordinates of the given triangles; CompactIndex gathers them
+        # from its vertex table, so the leaf walking tools read through this rather than self.tri
+        return self.tri[rows]
+
+    def inside(self, queries, which, nodes):
+        # is query which[i] inside triangle nodes[i]
+        points, bound = queries
+        return points_inside_triangles(points[which], self.tri[nodes], bound[which])
+
+    def candidates(self, points):
+        # indices of the points that need the DAG: the rest are outside the polygon's
+        # bounding box or convex hull and therefore outside
+        if self.bounds is None:
+            polygon = self.tri_rows(np.flatnonzero(self.is_leaf & self.is_inside)).reshape(-1, 2)
+            if not len(polygon):
+                self.stats["queries"] += len(points)
+                self.stats["bbox_rejected"] += len(points)
+                return np.zeros(0, dtype=np.int64)
+            self.bounds = (polygon.min(axis=0), polygon.max(axis=0))
+        low, high = self.bounds
+        in_box = np.flatnonzero(((points >= low) & (points <= high)).all(axis=1))
+        keep = in_box
+        if self.use_hull and len(in_box):
+            if self.hull is None:
+                polygon = self.tri_rows(np.flatnonzero(self.is_leaf & self.is_inside)).reshape(-1, 2)
+                self.hull = ConvexIndex(convex_hull(polygon))
+            keep = in_box[self.hull.locate_many(points[in_box])]
+        self.stats["queries"] += len(points)
+        self.stats["bbox_rejected"] += len(points) - len(in_box)
+        self.stats["hull_rejected"] += len(in_box) - len(keep)
+        return keep
+
+    def locate_many(self, points, order=None):
+        # order='hilbert' or 'morton' walks the points along a space filling curve so
+        # consecutive points share most of their path through the DAG
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        keep = self.candidates(points)
+        leaves = np.full(len(points), -1, dtype=np.int64)
+        if order is None:
+            leaves[keep] = self.locate_leaves(points[keep])
+        elif len(keep):
+            perm = keep[curve_order(points[keep], self.tri_rows(0), order)]
+            leaves[perm] = self.locate_leaves(points[perm])
+        return (leaves >= 0) & self.is_inside[np.maximum(leaves, 0)]
+
+    def locate(self, point):
+        return bool(self.locate_many([point])[0])
+
+    def query_window(self, xmin, ymin, xmax, ymax):
+        """
+        Indices of the leaves whose triangle intersects the closed box, sorted. Whole
+        subtrees are skipped as soon as their triangle misses the box; is_inside[leaves]
+        gives the inside flags and node_ids[leaves] the TriangleNode ids.
+        """
+        visited = np.zeros(len(self.is_leaf), dtype=bool)
+        visited[0] = True
+        frontier = np.zeros(1, dtype=np.int64)
+        frontier = frontier[triangles_intersect_box(self.tri_rows(frontier), xmin, ymin, xmax, ymax)]
+        found = []
+        while frontier.size:
+            leaf = self.is_leaf[frontier]
+            found.append(frontier[leaf])
+            internal = frontier[~leaf]
+            start, count = self.child_ptr[internal], self.child_ptr[internal + 1] - self.child_ptr[internal]
+            # all child_idx[start:start + count] ranges at once
+            offsets = np.repeat(start - np.cumsum(count) + count, count) + np.arange(count.sum())
+            children = np.unique(self.child_idx[offsets])
+            children = children[~visited[children]]
+            visited[children] = True
+            frontier = children[triangles_intersect_box(self.tri_rows(children), xmin, ymin, xmax, ymax)]
+        return np.sort(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def clipped_inside_area(self, xmin, ymin, xmax, ymax):
+        # area of the polygon inside the box: inside leaves are clipped to it and summed
+        leaves = self.query_window(xmin, ymin, xmax, ymax)
+        tri = self.tri_rows(leaves[self.is_inside[leaves]])
+        contained = ((tri[:, :, 0] >= xmin) & (tri[:, :, 0] <= xmax) &
+                     (tri[:, :, 1] >= ymin) & (tri[:, :, 1] <= ymax)).all(axis=1)
+        whole = tri[contained]
+        area = np.abs((whole[:, 1, 0] - whole[:, 0, 0]) * (whole[:, 2, 1] - whole[:, 0, 1]) -
+                      (whole[:, 2, 0] - whole[:, 0, 0]) * (whole[:, 1, 1] - whole[:, 0, 1])).sum() / 2.0
+        # only triangles crossing the box edge need the (slow) clipping
+        for corners in tri[~contained].tolist():
+            area += polygon_area(clip_to_box(corners, xmin, ymin, xmax, ymax))
+        return float(area)
+
+    def leaf_neighbours(self):
+        # neighbours[i, e] is the leaf across edge e = (v_e, v_e+1) of leaf i, -1 on the outer boundary
+        if self.neighbours is not None:
+            return self.neighbours
+        leaves = np.flatnonzero(self.is_leaf)
+        tri = self.tri_rows(leaves)
+        edges = []
+        for a, b in ((0, 1), (1, 2), (2, 0)):
+            pa, pb = tri[:, a], tri[:, b]
+            # shared vertices are the same Vertex objects, so their coordinates match exactly
+            swap = (pa[:, 0] > pb[:, 0]) | ((pa[:, 0] == pb[:, 0]) & (pa[:, 1] > pb[:, 1]))
+            lo = np.where(swap[:, None], pb, pa)
+            hi = np.where(swap[:, None], pa, pb)
+            edges.append(np.hstack((lo, hi)))
+        keys = np.vstack(edges)
+        owner = np.tile(leaves, 3)
+        edge_no = np.repeat(np.arange(3), len(leaves))
+        order = np.lexsort(keys.T[::-1])
+        keys, owner, edge_no = keys[order], owner[order], edge_no[order]
+        same = (keys[1:] == keys[:-1]).all(axis=1)
+        neighbours = np.full((len(self.is_leaf), 3), -1, dtype=np.int64)
+        first = np.flatnonzero(same)
+        neighbours[owner[first], edge_no[first]] = owner[first + 1]
+        neighbours[owner[first + 1], edge_no[first + 1]] = owner[first]
+        neighbours.setflags(write=False)
+        self.neighbours = neighbours
+        return neighbours
+
+    def boundary_edges(self):
+        # polygon edges are the leaf edges with an inside leaf on one side and an outside leaf on
+        # the other: returns their endpoints (m, 2, 2) and leaf_edge[i, e], the row of edge e of
+        # leaf i in that array or -1
+        if self.boundary is not None:
+            return self.boundary
+        neighbours = self.leaf_neighbours()
+        leaves = np.flatnonzero(self.is_leaf)
+        leaf_edge = np.full((len(self.is_leaf), 3), -1, dtype=np.int64)
+        segments = []
+        for e in range(3):
+            across = neighbours[leaves, e]
+            # each polygon edge is recorded once, from its inside leaf, and shared with the outside one
+            crossing = self.is_inside[leaves] & (across >= 0) & ~self.is_inside[np.maximum(across, 0)]
+            owners, others = leaves[crossing], across[crossing]
+            rows = np.arange(len(owners)) + sum(len(s) for s in segments)
+            leaf_edge[owners, e] = rows
+            # the same edge seen from the outside leaf
+            back = (neighbours[others] == owners[:, None]).argmax(axis=1)
+            leaf_edge[others, back] = rows
+            corners = self.tri_rows(owners)
+            segments.append(np.stack((corners[:, e], corners[:, (e + 1) % 3]), axis=1))
+        self.boundary = (np.concatenate(segments), leaf_edge)
+        return self.boundary
+
+    def distance_many(self, points):
+        """
+        Signed distance from each point to the polygon boundary (negative inside) and the
+        nearest boundary segment as (n, 2, 2) endpoints. Starts at the leaf containing the
+        point and grows outwards over leaf adjacency, only into leaves closer than the best
+        boundary edge found so far, so the work depends on the distance, not on n.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        segments, leaf_edge = self.boundary_edges()
+        neighbours = self.leaf_neighbours()
+        n = len(points)
+        best = np.full(n, np.inf)
+        nearest = np.full(n, -1, dtype=np.int64)
+        leaves = self.locate_leaves(points)
+        lost = np.flatnonzero(leaves < 0)
+        if len(lost):
+            # outside the outer triangle: start from its point nearest to the query instead, the
+            # part of the search disk inside the triangle is convex, so it is still reachable from there
+            root = self.tri_rows(0)
+            gaps = [points_segments_distance(points[lost], np.broadcast_to(root[e], (len(lost), 2)),
+                                             np.broadcast_to(root[(e + 1) % 3], (len(lost), 2))) for e in range(3)]
+            edge = np.argmin(gaps, axis=0)
+            a, b = root[edge], root[(edge + 1) % 3]
+            ab = b - a
+            t = np.clip(((points[lost] - a) * ab).sum(axis=1) / (ab * ab).sum(axis=1), 0.0, 1.0)
+            # nudged towards the centre so it is inside the triangle rather than on its edge
+            start = a + t[:, None] * ab
+            start += (root.mean(axis=0) - start) * 1e-9
+            leaves[lost] = self.locate_leaves(start)
+        located = np.flatnonzero(leaves >= 0)
+
+        stride = len(self.is_leaf)
+        owner, leaf = located, leaves[located]
+        visited = np.sort(owner * stride + leaf)
+        while len(owner):
+            # boundary edges of the frontier leaves
+            for e in range(3):
+                row = leaf_edge[leaf, e]
+                has = row >= 0
+                p, r = owner[has], row[has]
+                d = points_segments_distance(points[p], segments[r, 0], segments[r, 1])
+                # smallest d per point first, so the fancy assignment keeps it
+                order = np.argsort(-d)
+                p, r, d = p[order], r[order], d[order]
+                better = d < best[p]
+                best[p[better]] = d[better]
+                nearest[p[better]] = r[better]
+            # grow into unvisited neighbours that could still hold a closer edge
+            p = np.repeat(owner, 3)
+            nxt = neighbours[leaf].ravel()
+            keep = nxt >= 0
+            p, nxt = p[keep], nxt[keep]
+            keys, first = np.unique(p * stride + nxt, return_index=True)
+            p, nxt = p[first], nxt[first]
+            fresh = ~np.isin(keys, visited, assume_unique=True)
+            p, nxt, keys = p[fresh], nxt[fresh], keys[fresh]
+            tri = self.tri_rows(nxt)
+            gap = np.minimum.reduce([points_segments_distance(points[p], tri[:, e], tri[:, (e + 1) % 3])
+                                     for e in range(3)])
+            close = gap <= best[p]
+            owner, leaf = p[close], nxt[close]
+            added = keys[close]  # unique and not visited yet, so a sorted insert keeps visited a set
+            visited = np.insert(visited, np.searchsorted(visited, added), added)
+
+        inside = np.zeros(n, dtype=bool)
+        inside[located] = self.is_inside[leaves[located]]
+        inside[lost] = False
+        ends = segments[np.maximum(nearest, 0)] if len(segments) else np.full((n, 2, 2), np.nan)
+        return np.where(inside, -best, best), ends
+
+    def distance(self, point):
+        signed, ends = self.distance_many([point])
+        return float(signed[0]), tuple(map(tuple, ends[0].tolist()))
+
+    def leaf_spans(self, leaves, y):
+        # x extent of each leaf triangle along the horizontal line at y, and the edge it leaves through on the right
+        tri = self.tri_rows(leaves)
+        low = np.full(len(leaves), np.inf)
+        high = np.full(len(leaves), -np.inf)
+        exit_edge = np.zeros(len(leaves), dtype=np.int64)
+        for e, (a, b) in enumerate(((0, 1), (1, 2), (2, 0))):
+            xa, ya = tri[:, a, 0], tri[:, a, 1]
+            xb, yb = tri[:, b, 0], tri[:, b, 1]
+            crosses = (np.minimum(ya, yb) <= y) & (y <= np.maximum(ya, yb)) & (ya != yb)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = xa + (y - ya) * (xb - xa) / (yb - ya)
+            low = np.where(crosses, np.minimum(low, x), low)
+            further = crosses & (x > high)
+            high = np.where(further, x, high)
+            exit_edge = np.where(further, e, exit_edge)
+        return low, high, exit_edge
+
+    def rasterize_block(self, x0, y0, dx, dy, width, height, dtype=np.uint8):
+        """
+        Inside/outside mask of a height x width raster, pixel (i, j) sampled at
+        (x0 + j * dx, y0 + i * dy). Each row is located once through the DAG and
+        then walks from leaf to neighbouring leaf across the edge where the row
+        leaves the triangle, filling the whole run of pixels under each leaf.
+        Rows whose walk gets ambiguous (the line runs through a vertex) are
+        located again through the DAG.
+        """
+        neighbours = self.leaf_neighbours()
+        # +1/-1 at run starts/ends, the cumulative sum along a row is the mask
+        runs = np.zeros((height, width + 1), dtype=np.int32)
+        ys = y0 + np.arange(height) * dy
+        rows = np.arange(height)
+        col = np.zeros(height, dtype=np.int64)  # next column not decided yet
+        leaf = np.full(height, -1, dtype=np.int64)  # -1: locate through the DAG
+        prev_high = np.full(height, -np.inf)
+        while rows.size:
+            relocate = rows[leaf[rows] < 0]
+            if relocate.size:
+                leaf[relocate] = self.locate_leaves(np.column_stack((x0 + col[relocate] * dx, ys[relocate])))
+                # a pixel outside every triangle (beyond the outer triangle) is outside
+                missed = relocate[leaf[relocate] < 0]
+                col[missed] += 1
+                prev_high[relocate] = -np.inf
+            walking = rows[leaf[rows] >= 0]
+            if walking.size:
+                current = leaf[walking]
+                low, high, exit_edge = self.leaf_spans(current, ys[walking])
+                stuck = ~(high > prev_high[walking])
+                last = np.floor((high - x0) / dx).astype(np.int64)
+                # a freshly located leaf contains the pixel at col even if rounding says otherwise
+                fresh = np.isneginf(prev_high[walking])
+                last = np.where(fresh, np.maximum(last, col[walking]), last)
+                last = np.minimum(last, width - 1)
+                fill = ~stuck & self.is_inside[current] & (last >= col[walking])
+                np.add.at(runs, (walking[fill], col[walking][fill]), 1)
+                np.add.at(runs, (walking[fill], last[fill] + 1), -1)
+                advance = ~stuck
+                col[walking[advance]] = np.maximum(col[walking[advance]], last[advance] + 1)
+                prev_high[walking[advance]] = high[advance]
+                leaf[walking[advance]] = neighbours[current[advance], exit_edge[advance]]
+                # walking into the wrong leaf or off the outer triangle: fall back to the DAG
+                leaf[walking[stuck]] = -1
+                # crossing the outer triangle's boundary, the rest of the row is outside
+                off = walking[advance][leaf[walking[advance]] < 0]
+                col[off] = width
+            rows = rows[col[rows] < width]
+        return (np.cumsum(runs[:, :width], axis=1) > 0).astype(dtype)
+
+    def rasterize_tiles(self, x0, y0, dx, dy, width, height, tile=(256, 4096), dtype=np.uint8):
+        # yields (row, col, block) so arbitrarily large rasters can be streamed in bounded memory
+        tile_rows, tile_cols = tile
+        for row in range(0, height, tile_rows):
+            for col in range(0, width, tile_cols):
+                block = self.rasterize_block(x0 + col * dx, y0 + row * dy, dx, dy,
+                                             min(tile_cols, width - col), min(tile_rows, height - row), dtype)
+                yield row, col, block
+
+    def rasterize(self, x0, y0, dx, dy, width, height, tile=None, dtype=np.uint8):
+        if tile is None:
+            return self.rasterize_block(x0, y0, dx, dy, width, height, dtype)
+        mask = np.zeros((height, width), dtype=dtype)
+        for row, col, block in self.rasterize_tiles(x0, y0, dx, dy, width, height, tile, dtype):
+            mask[row:row + block.shape[0], col:col + block.shape[1]] = block
+        return mask
+
         
 def generate_simple_polygon(num_sides):
     # Generate random points
@@ -284,125 +1102,3 @@ def generate_simple_polygon(num_sides):
     
     # Return the sorted points
     return sorted_points
-
-"""
-    TEST Kirkpatrick POINT LOCATION PERFORMANCE
-"""
-                 
-if __name__ == "__main__":
-    # num_points = [1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 9000, 10000, 11000, 12000, 13000, 14000, 15000, 16000, 17000, 18000, 19000, 20000]
-    # num_points = [1000, 2000, 3000]
-    num_points = [n for n in range(500, 30001, 500)]
-    preprocessing_times = []
-    avg_query_times = []
-    
-    for n in num_points:
-        points = generate_simple_polygon(n)
-        polygon = Polygon(points) # testing the accuracy of the result using shapely  
-        kp = Kirkpatrick(points)
-        start_time = time.time()
-        kp.preprocessing()
-        preprocessing_times.append(time.time() - start_time)
-        query_times = []
-        for _ in range(500):
-            point = np.random.rand(2)
-            # shapely_point = Point(point)
-            
-            start_time = time.time()
-            inside_kp  = kp.point_location(point)
-            query_times.append(time.time() - start_time)
-            
-            inside_shapely = shapely_point.within(polygon)           
-            # test point location result       
-            if inside_kp  != inside_shapely:
-                raise ValueError("Mismatch between Kirkpatrick and Shapely results for point:", point)
-        avg_query_times.append(np.mean(query_times))
-        
-    # Table  
-    results_df = pd.DataFrame({
-        'Num Points': num_points,
-        'Preprocessing Time': preprocessing_times,
-        'Average Query Time': avg_query_times
-    })
-
-    print(results_df)
-    # Save as a tab-separated values file (.txt)
-    results_df.to_csv('results.txt', sep='\t', index=False)
-
-
-    # Plotting
-    # fig, ax1 = plt.subplots()
-
-    # color = 'tab:red'
-    # ax1.set_xlabel('Num Points')
-    # ax1.set_ylabel('Preprocessing Time', color=color)
-    # ax1.plot(results_df['Num Points'], results_df['Preprocessing Time'], color=color)
-    # ax1.tick_params(axis='y', labelcolor=color)
-
-    # ax2 = ax1.twinx()
-    # color = 'tab:blue'
-    # ax2.set_ylabel('Average Query Time', color=color)
-    # ax2.plot(results_df['Num Points'], results_df['Average Query Time'], color=color)
-    # ax2.tick_params(axis='y', labelcolor=color)
-
-    # fig.tight_layout()
-    # plt.title('Kirkpatrick Point Location Time Complexity')
-    # plt.show()
-    
-    # Plot Preprocessing Time
-    plt.figure(figsize=(10, 6))
-    plt.plot(results_df['Num Points'], results_df['Preprocessing Time'], marker='o', linestyle='-', color='r')
-    plt.title('Preprocessing Time Complexity Analysis')
-    plt.xlabel('Number of Points')
-    plt.ylabel('Preprocessing Time (seconds)')
-    plt.grid(True, which="both", ls="--")
-    plt.show()
-
-    # Plot Average Query Time
-    plt.figure(figsize=(10, 6))
-    plt.plot(results_df['Num Points'], results_df['Average Query Time'], marker='o', linestyle='-', color='b')
-    plt.title('Query Time Complexity Analysis ')
-    plt.xlabel('Number of Points')
-    plt.ylabel('Average Query Time (seconds)')
-    plt.grid(True, which="both", ls="--")
-    plt.show()
-    
-    # Plotting Preprocessing Time using a Log-Log Plot
-    plt.figure(figsize=(10, 6))
-    plt.loglog(results_df['Num Points'], results_df['Preprocessing Time'], marker='o', linestyle='-', color='r')
-    plt.xlabel('Log Number of Points')
-    plt.ylabel('Log Preprocessing Time (seconds)')
-    plt.title('Preprocessing Time Complexity Analysis Log-Log Plot')
-    plt.grid(True, which="both", ls="--")
-
-    plt.show()
-    
-    # Plotting Preprocessing Time using a Semi-Log Plot (Logarithmic y-axis)
-    plt.figure(figsize=(10, 6))
-    plt.semilogy(results_df['Num Points'], results_df['Preprocessing Time'], marker='o', linestyle='-', color='r')
-    plt.xlabel('Number of Points')
-    plt.ylabel('Log Preprocessing Time (seconds)')
-    plt.title('Preprocessing Time Complexity Analysis Semi-Log Plot (Log y-axis)')
-    plt.grid(True, which="both", ls="--")
-
-    plt.show()
-
-    # Plotting Average Query Time using a Semi-Log Plot (Logarithmic y-axis)
-    plt.figure(figsize=(10, 6))
-    plt.semilogy(results_df['Num Points'], results_df['Average Query Time'], marker='o', linestyle='-', color='b')
-    plt.xlabel('Number of Points')
-    plt.ylabel('Log Average Query Time (seconds)')
-    plt.title('Query Time Complexity Analysis Semi-Log Plot')
-    plt.grid(True, which="both", ls="--")
-
-    plt.show()
-    
-    # Plotting Average Query Time using a Log-Log Plot
-    plt.figure(figsize=(10, 6))
-    plt.loglog(results_df['Num Points'], results_df['Average Query Time'], marker='o', linestyle='-', color='b')
-    plt.xlabel('Log Number of Points')
-    plt.ylabel('Log Average Query Time (seconds)')
-    plt.title('Query Time Complexity Analysis Log-Log Plot')
-    plt.grid(True, which="both", ls="--")
-
-    plt.show()
\ No newline at end of file
@@ -0,0 +1,76 @@
+# load_client.py
+"""
+Load generator for server.py: opens a number of connections, keeps a fixed
+number of queries in flight on each and reports throughput and latency.
+"""
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from server import REQUEST, RESPONSE, LENGTH, OP_QUERY, OP_STATS
+
+
+async def open_connection(host, port, path):
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+async def run_connection(host, port, path, index, num_requests, in_flight, latencies):
+    reader, writer = await open_connection(host, port, path)
+    sent_at = {}
+    points = np.random.rand(num_requests, 2)
+
+    async def receive():
+        for _ in range(num_requests):
+            op, req_id, result = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+            latencies.append(time.perf_counter() - sent_at.pop(req_id))
+            window.release()
+
+    window = asyncio.Semaphore(in_flight)
+    receiver = asyncio.ensure_future(receive())
+    for req_id, (x, y) in enumerate(points):
+        await window.acquire()
+        sent_at[req_id] = time.perf_counter()
+        writer.write(REQUEST.pack(OP_QUERY, req_id, index, x, y))
+        await writer.drain()
+    await receiver
+    writer.close()
+
+
+async def fetch_stats(host, port, path):
+    reader, writer = await open_connection(host, port, path)
+    writer.write(REQUEST.pack(OP_STATS, 0, 0, 0.0, 0.0))
+    await reader.readexactly(RESPONSE.size)
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    body = await reader.readexactly(length)
+    writer.close()
+    return json.loads(body)
+
+
+async def main(args):
+    latencies = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*[
+        run_connection(args.host, args.port, args.unix, args.index, args.requests, args.in_flight, latencies)
+        for _ in range(args.connections)
+    ])
+    elapsed = time.perf_counter() - start_time
+    lat = np.array(latencies) * 1e6
+    total = args.connections * args.requests
+    print(f"{total} requests in {elapsed:.2f}s, {total / elapsed:.0f} req/s")
+    print(f"client latency us: p50 {np.percentile(lat, 50):.0f}  p99 {np.percentile(lat, 99):.0f}  max {lat.max():.0f}")
+    print("server metrics:", json.dumps(await fetch_stats(args.host, args.port, args.unix), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate query load against server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None)
+    parser.add_argument("--index", type=int, default=0)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per connection")
+    parser.add_argument("--in-flight", type=int, default=32, help="outstanding requests per connection")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,191 @@
+# loaders.py
+"""
+Polygon input as packed float64 arrays.
+
+Every loader returns Rings(coords, ring_ptr, polygon_ptr): all ring vertices
+in one contiguous (n, 2) float64 array, ring i being
+coords[ring_ptr[i]:ring_ptr[i + 1]] (no repeated closing vertex) and polygon
+j being rings polygon_ptr[j] to polygon_ptr[j + 1], its exterior ring first
+and its holes after. Coordinates go from the source text or bytes straight
+into NumPy, never through per-vertex Python objects, and Kirkpatrick takes a
+Rings as it is.
+
+    from_array(points)     one ring from an (n, 2) array or a sequence of pairs
+    from_polygons(polys)   a list of polygons, each a list of ring arrays
+    from_geojson(obj)      Polygon / MultiPolygon / Feature / FeatureCollection, dict or text
+    from_wkt(text)         POLYGON / MULTIPOLYGON, with or without Z / M
+    from_wkb(data)         the same as (E)WKB bytes, either byte order
+    load(source)           any of the above, by looking at it
+"""
+import json
+import re
+import struct
+from collections import namedtuple
+import numpy as np
+
+Rings = namedtuple("Rings", "coords ring_ptr polygon_ptr")
+
+
+def open_ring(ring):
+    # drop the closing vertex GeoJSON, WKT and WKB repeat
+    if len(ring) > 1 and ring[0, 0] == ring[-1, 0] and ring[0, 1] == ring[-1, 1]:
+        return ring[:-1]
+    return ring
+
+
+def from_array(points):
+    coords = np.ascontiguousarray(open_ring(np.asarray(points, dtype=np.float64).reshape(-1, 2)))
+    return Rings(coords, np.array([0, len(coords)], dtype=np.int64), np.array([0, 1], dtype=np.int64))
+
+
+def from_polygons(polygons):
+    rings = [open_ring(np.asarray(ring, dtype=np.float64)[:, :2]) for polygon in polygons for ring in polygon]
+    ring_ptr = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum([len(ring) for ring in rings], out=ring_ptr[1:])
+    polygon_ptr = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum([len(polygon) for polygon in polygons], out=polygon_ptr[1:])
+    coords = np.concatenate(rings) if rings else np.zeros((0, 2))
+    return Rings(np.ascontiguousarray(coords), ring_ptr, polygon_ptr)
+
+
+def geojson_polygons(geometry):
+    kind = geometry["type"]
+    if kind == "Feature":
+        return geojson_polygons(geometry["geometry"])
+    if kind == "FeatureCollection":
+        return [p for feature in geometry["features"] for p in geojson_polygons(feature)]
+    if kind == "GeometryCollection":
+        return [p for part in geometry["geometries"] for p in geojson_polygons(part)]
+    if kind == "Polygon":
+        return [geometry["coordinates"]]
+    if kind == "MultiPolygon":
+        return list(geometry["coordinates"])
+    raise ValueError(f"no polygon in a GeoJSON {kind}")
+
+
+def from_geojson(obj):
+    if isinstance(obj, (str, bytes)):
+        obj = json.loads(obj)
+    return from_polygons(geojson_polygons(obj))
+
+
+WKT_DIMENSIONS = {"": 2, "Z": 3, "M": 3, "ZM": 4}
+
+
+def from_wkt(text):
+    match = re.match(r"\s*(?:SRID=\d+;)?\s*(MULTIPOLYGON|POLYGON)\s*(ZM|Z|M)?\s*\(", text, re.IGNORECASE)
+    if match is None:
+        raise ValueError("expected a POLYGON or MULTIPOLYGON")
+    dimensions = WKT_DIMENSIONS[(match.group(2) or "").upper()]
+    body = text[match.end() - 1:]
+    if match.group(1).upper() == "POLYGON":
+        body = "(" + body + ")"  # read it as a multipolygon of one
+    polygons = []
+    # each polygon is ((ring), (ring), ...), each ring a run of numbers without parentheses
+    for polygon in re.findall(r"\(\s*(\([^()]*\)(?:\s*,\s*\([^()]*\))*)\s*\)", body[1:-1]):
+        rings = []
+        for ring in re.findall(r"\(([^()]*)\)", polygon):
+            values = np.array(ring.replace(",", " ").split(), dtype=np.float64)
+            rings.append(values.reshape(-1, dimensions))
+        polygons.append(rings)
+    if not polygons:
+        raise ValueError("empty polygon")
+    return from_polygons(polygons)
+
+
+# EWKB flags on the geometry type, ISO WKB adds 1000 / 2000 / 3000 instead
+EWKB_Z, EWKB_M, EWKB_SRID = 0x80000000, 0x40000000, 0x20000000
+
+
+def read_wkb_geometry(data, offset, polygons):
+    order = "<" if data[offset] == 1 else ">"
+    (kind,) = struct.unpack_from(order + "I", data, offset + 1)
+    offset += 5
+    dimensions = 2 + bool(kind & EWKB_Z) + bool(kind & EWKB_M)
+    if kind & EWKB_SRID:
+        offset += 4
+    kind &= 0x0FFFFFFF
+    dimensions += {1: 1, 2: 1, 3: 2}.get(kind // 1000, 0)
+    kind %= 1000
+    if kind == 3:
+        (num_rings,) = struct.unpack_from(order + "I", data, offset)
+        offset += 4
+        rings = []
+        for _ in range(num_rings):
+            (num_points,) = struct.unpack_from(order + "I", data, offset)
+            offset += 4
+            values = np.frombuffer(data, dtype=order + "f8", count=num_points * dimensions, offset=offset)
+            rings.append(values.reshape(-1, dimensions))
+            offset += values.nbytes
+        polygons.append(rings)
+    elif kind in (6, 7):  # MultiPolygon, GeometryCollection: a count, then whole geometries
+        (num_parts,) = struct.unpack_from(order + "I", data, offset)
+        offset += 4
+        for _ in range(num_parts):
+            offset = read_wkb_geometry(data, offset, polygons)
+    else:
+        raise ValueError(f"no polygon in WKB geometry type {kind}")
+    return offset
+
+
+def from_wkb(data):
+    if isinstance(data, str):
+        data = bytes.fromhex(data)
+    polygons = []
+    read_wkb_geometry(memoryview(data).cast("B"), 0, polygons)
+    return from_polygons(polygons)
+
+
+def load(source):
+    if isinstance(source, Rings):
+        return source
+    if isinstance(source, dict):
+        return from_geojson(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if bytes(source[:1]) in (b"\x00", b"\x01"):
+            return from_wkb(source)
+        source = bytes(source).decode()
+    if isinstance(source, str):
+        text = source.lstrip()
+        if text.startswith("{"):
+            return from_geojson(text)
+        if re.fullmatch(r"[0-9a-fA-F]+", text.strip()):
+            return from_wkb(text.strip())
+        return from_wkt(text)
+    return from_array(source)
+
+
+if __name__ == "__main__":
+    """
+    BENCHMARK: time and peak memory from polygon source to the first (leaf) triangulation
+    """
+    import time
+    import tracemalloc
+    from kp import Kirkpatrick, generate_simple_polygon
+    from loaders import load  # the module's Rings, not __main__'s, is the one kp recognises
+
+    def first_triangulation(source):
+        kp = Kirkpatrick(load(source), force_dag=True)
+        steps = kp.build_steps()
+        next(steps)  # the leaf triangulation
+        steps.close()
+
+    np.random.seed(4)
+    for n in [1000, 10000, 50000]:
+        points = generate_simple_polygon(n)
+        closed = np.vstack((points, points[:1]))
+        ring = ", ".join(f"{x!r} {y!r}" for x, y in closed.tolist())
+        sources = {"array": points, "wkt": f"POLYGON (({ring}))",
+                   "wkb": struct.pack("<BIII", 1, 3, 1, len(closed)) + closed.astype("<f8").tobytes(),
+                   "geojson": json.dumps({"type": "Polygon", "coordinates": [closed.tolist()]})}
+        for name, source in sources.items():
+            timings = []
+            for _ in range(3):
+                start_time = time.perf_counter()
+                first_triangulation(source)
+                timings.append(time.perf_counter() - start_time)
+            tracemalloc.start()
+            first_triangulation(source)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"n={n:6d}  {name:8s} first triangulation {min(timings):.3f}s  peak {peak / 1e6:6.1f} MB")
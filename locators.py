@@ -0,0 +1,284 @@
+# locators.py
+"""
+Point location engines behind one interface.
+
+Every engine is a Locator: build(points) returns the built locator,
+locate(point) / locate_many(points) answer inside/outside, save(file) and
+Locator.load(file) round-trip the built structure. select_locator picks the
+engine that should be cheapest for a given polygon and query volume.
+
+    kirkpatrick  the DAG hierarchy from kp.py, O(log n) queries, slowest build
+    convex       wedge binary search, convex polygons only, no build
+    slab         x-slabs searched with bisect, O(log n) queries, O(n^2) memory
+    raycast      crossing count over every edge, no build, O(n) queries
+"""
+import bisect
+import functools
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+from kp import Kirkpatrick, FrozenIndex
+from convex import ConvexIndex, convex_ring
+
+
+class Locator(ABC):
+    name = None
+
+    @abstractmethod
+    def build(self, points):
+        """Build the structure for a polygon and return self."""
+
+    def locate(self, point):
+        return bool(self.locate_many([point])[0])
+
+    @abstractmethod
+    def locate_many(self, points):
+        """Inside/outside for an (n, 2) array of points, as a bool array."""
+
+    @abstractmethod
+    def arrays(self):
+        """The built structure as a dict of arrays, for save."""
+
+    @classmethod
+    @abstractmethod
+    def from_arrays(cls, data):
+        """The locator back from what arrays returned."""
+
+    def save(self, file):
+        # file is a path or an open binary file, as for np.savez
+        np.savez(file, engine=np.array(self.name), **self.arrays())
+
+    @staticmethod
+    def load(file):
+        with np.load(file) as data:
+            return ENGINES[str(data['engine'])].from_arrays(data)
+
+
+class KirkpatrickLocator(Locator):
+    name = "kirkpatrick"
+
+    def __init__(self, index=None, max_degree=12):
+        self.index = index  # FrozenIndex
+        self.max_degree = max_degree
+
+    def build(self, points):
+        kp = Kirkpatrick(points, force_dag=True, max_degree=self.max_degree)
+        kp.preprocessing()
+        self.index = kp.freeze()
+        return self
+
+    def locate_many(self, points):
+        return self.index.locate_many(points)
+
+    def arrays(self):
+        return self.index.arrays()
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(FrozenIndex.from_arrays(data))
+
+
+class ConvexLocator(Locator):
+    name = "convex"
+
+    def __init__(self, index=None):
+        self.index = index  # ConvexIndex
+
+    def build(self, points):
+        self.index = ConvexIndex.from_points(points)
+        return self
+
+    def locate_many(self, points):
+        return self.index.locate_many(points)
+
+    def arrays(self):
+        return self.index.arrays()
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(ConvexIndex.from_arrays(data))
+
+
+def polygon_edges(points):
+    ring = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return ring, np.roll(ring, -1, axis=0)
+
+
+class RayCastLocator(Locator):
+    name = "raycast"
+
+    def __init__(self, ring=None, chunk=1 << 22):
+        self.ring = ring
+        self.chunk = chunk  # points x edges evaluated per step, bounds the temporary arrays
+
+    def build(self, points):
+        self.ring = np.array(points, dtype=np.float64).reshape(-1, 2)
+        return self
+
+    def locate_many(self, points):
+        q = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        a, b = polygon_edges(self.ring)
+        inside = np.zeros(len(q), dtype=bool)
+        step = max(1, self.chunk // len(a))
+        for start in range(0, len(q), step):
+            x = q[start:start + step, 0][:, None]
+            y = q[start:start + step, 1][:, None]
+            straddles = (a[:, 1] > y) != (b[:, 1] > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = a[:, 0] + (y - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+            inside[start:start + step] = (straddles & (x < x_cross)).sum(axis=1) % 2 == 1
+        return inside
+
+    def arrays(self):
+        return {'ring': self.ring}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(np.array(data['ring']))
+
+
+class SlabLocator(Locator):
+    """
+    Vertical slabs between consecutive vertex x coordinates. Inside a slab no
+    two edges cross, so the edges spanning it are sorted by height and the
+    number of edges below a point (its crossing count) is a binary search.
+    """
+    name = "slab"
+
+    def __init__(self, xs=None, slab_ptr=None, edge_x=None, edge_y=None, edge_slope=None):
+        self.xs = xs  # slab boundaries
+        self.slab_ptr = slab_ptr  # edges of slab i are [slab_ptr[i], slab_ptr[i+1]), bottom to top
+        self.edge_x = edge_x  # each edge as y = edge_y + (x - edge_x) * edge_slope
+        self.edge_y = edge_y
+        self.edge_slope = edge_slope
+        self.xs_list = list(xs) if xs is not None else None
+
+    def build(self, points):
+        a, b = polygon_edges(points)
+        keep = a[:, 0] != b[:, 0]  # vertical edges never span a slab
+        a, b = a[keep], b[keep]
+        left = np.minimum(a[:, 0], b[:, 0])
+        right = np.maximum(a[:, 0], b[:, 0])
+        slope = (b[:, 1] - a[:, 1]) / (b[:, 0] - a[:, 0])
+        xs = np.unique(np.concatenate((a[:, 0], b[:, 0])))
+        counts = []
+        order = []
+        for i in range(len(xs) - 1):
+            middle = (xs[i] + xs[i + 1]) / 2
+            spanning = np.flatnonzero((left <= xs[i]) & (right >= xs[i + 1]))
+            height = a[spanning, 1] + (middle - a[spanning, 0]) * slope[spanning]
+            order.append(spanning[np.argsort(height)])
+            counts.append(len(spanning))
+        edges = np.concatenate(order) if order else np.zeros(0, dtype=np.int64)
+        slab_ptr = np.zeros(len(xs), dtype=np.int64)
+        np.cumsum(counts, out=slab_ptr[1:])
+        self.__init__(xs, slab_ptr, a[edges, 0], a[edges, 1], slope[edges])
+        return self
+
+    def locate(self, point):
+        x, y = point
+        slab = bisect.bisect_right(self.xs_list, x) - 1
+        if slab < 0 or slab >= len(self.xs_list) - 1:
+            return False
+        lo, hi = int(self.slab_ptr[slab]), int(self.slab_ptr[slab + 1])
+        first = lo
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.edge_y[mid] + (x - self.edge_x[mid]) * self.edge_slope[mid] < y:
+                lo = mid + 1
+            else:
+                hi = mid
+        return (lo - first) % 2 == 1
+
+    def locate_many(self, points):
+        q = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x, y = q[:, 0], q[:, 1]
+        slab = np.searchsorted(self.xs, x, side='right') - 1
+        valid = (slab >= 0) & (slab < len(self.xs) - 1)
+        slab = np.clip(slab, 0, max(len(self.xs) - 2, 0))
+        first = self.slab_ptr[slab]
+        lo = first.copy()
+        hi = np.where(valid, self.slab_ptr[slab + 1], lo)
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = (lo + hi) // 2
+            safe = np.minimum(mid, len(self.edge_y) - 1)
+            below = self.edge_y[safe] + (x - self.edge_x[safe]) * self.edge_slope[safe] < y
+            lo = np.where(active & below, mid + 1, lo)
+            hi = np.where(active & ~below, mid, hi)
+        return valid & ((lo - first) % 2 == 1)
+
+    def arrays(self):
+        return {'xs': self.xs, 'slab_ptr': self.slab_ptr, 'edge_x': self.edge_x,
+                'edge_y': self.edge_y, 'edge_slope': self.edge_slope}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data['xs'], data['slab_ptr'], data['edge_x'], data['edge_y'], data['edge_slope'])
+
+
+ENGINES = {engine.name: engine for engine in (KirkpatrickLocator, ConvexLocator, SlabLocator, RayCastLocator)}
+
+# size of the polygon timed to estimate the Kirkpatrick build cost per vertex
+CALIBRATION_VERTICES = 500
+
+
+@functools.lru_cache(maxsize=None)
+def kirkpatrick_build_seconds_per_vertex():
+    """
+    Kirkpatrick build seconds per vertex on this machine, used to decide whether a build is
+    worth timing at all. Measured once per process on a star polygon instead of kept as a
+    constant, which every build speedup (and every other machine) leaves out of date. Small
+    builds are cheaper per vertex than large ones, so the estimate errs towards timing the build.
+    """
+    angles = np.linspace(0, 2 * np.pi, CALIBRATION_VERTICES, endpoint=False)
+    radii = np.where(np.arange(CALIBRATION_VERTICES) % 2, 0.6, 1.0)
+    star = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+    start_time = time.perf_counter()
+    KirkpatrickLocator().build(star)
+    return (time.perf_counter() - start_time) / CALIBRATION_VERTICES
+
+
+def time_queries(locator, sample):
+    start_time = time.perf_counter()
+    locator.locate_many(sample)
+    return (time.perf_counter() - start_time) / len(sample)
+
+
+def select_locator(points, expected_queries=10000, sample_size=1000, max_slab_vertices=2000):
+    """
+    Pick and build the engine with the lowest estimated build + expected_queries * query cost.
+    Returns (locator, report) where report maps engine name to its estimated total seconds.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if convex_ring(points) is not None:
+        return ConvexLocator().build(points), {"convex": 0.0}
+
+    n = len(points)
+    low, high = points.min(axis=0), points.max(axis=0)
+    sample = np.random.uniform(low, high, size=(sample_size, 2))
+    candidates = [RayCastLocator]
+    if n <= max_slab_vertices:
+        candidates.append(SlabLocator)
+
+    report = {}
+    best, best_cost = None, np.inf
+    for engine in candidates:
+        start_time = time.perf_counter()
+        locator = engine().build(points)
+        cost = time.perf_counter() - start_time + expected_queries * time_queries(locator, sample)
+        report[engine.name] = cost
+        if cost < best_cost:
+            best, best_cost = locator, cost
+
+    # only pay for a Kirkpatrick build when it could plausibly win
+    if n * kirkpatrick_build_seconds_per_vertex() < best_cost:
+        start_time = time.perf_counter()
+        locator = KirkpatrickLocator().build(points)
+        cost = time.perf_counter() - start_time + expected_queries * time_queries(locator, sample)
+        report[KirkpatrickLocator.name] = cost
+        if cost < best_cost:
+            best, best_cost = locator, cost
+    return best, report
@@ -0,0 +1,52 @@
+# panels/build_worker.py
+import queue
+import threading
+
+
+class BuildWorker:
+    """
+    Runs Kirkpatrick.build_steps() on a background thread and hands every
+    BuildStep to the Tk thread through a queue, which the panel polls with after().
+    Messages are (kind, payload): ("step", BuildStep), ("done", root),
+    ("cancelled", None) or ("error", exception).
+    """
+    def __init__(self, kp):
+        self.kp = kp
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="kp-build", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            for step in self.kp.build_steps():
+                if self.cancel_event.is_set():
+                    break
+                self.events.put(("step", step))
+            else:
+                self.events.put(("done", self.kp.root))
+                return
+            # the Tk thread has let go of this engine, so it is safe to tear it down here
+            self.kp.clear_vertices()
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            self.events.put(("error", e))
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def poll(self, limit=100):
+        # at most `limit` messages per call so one poll never blocks the event loop for long
+        messages = []
+        while len(messages) < limit:
+            try:
+                messages.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return messages
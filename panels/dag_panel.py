@@ -1,6 +1,5 @@
 # panels/dag_panel.py
 import tkinter as tk
-from .utils import point_inside_triangle
 
 class DAGPanel(tk.Canvas):
     def __init__(self, master, app, kp_panel, **kwargs):
@@ -14,23 +13,95 @@ class DAGPanel(tk.Canvas):
         self.node_horizontal_spacing = 32
         self.layer_vertical_spacing = 70
         self.layers = {} # start with layer 0 (leaf nodes)
+        self.layer_order = {} # layer -> (node ids left to right, x of the first node, y)
         self.root = None
         self.search_path = []
         self.result_text_id = None
         self.highlight_node_id = []
         self.point = None
         self.is_inside = False
+        # view transform, screen = world * scale + offset
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        # layers whose visible nodes would sit closer than this on screen are drawn as one summary
+        # bar until zoomed in: the node radius, so circles overlap by at most half and stay countable
+        self.min_node_spacing = 14  # pixels
+        self.redraw_pending = False
+        self.drag_start = None
+        self.bind("<ButtonPress-1>", self.start_drag)
+        self.bind("<B1-Motion>", self.drag)
+        self.bind("<MouseWheel>", self.zoom)
+        self.bind("<Button-4>", lambda event: self.zoom(event, 1.2))
+        self.bind("<Button-5>", lambda event: self.zoom(event, 1 / 1.2))
 
     def refresh(self):
-        if self.app.phase == "REMOVE":
-            print("REMOVE")
-            # self.delete("all")
-            self.draw_layer(list(self.kp_panel.active_triangles.values()))
-            self.draw_edges()
+        # REMOVE layers are drawn by add_layer once the build worker has delivered the level
         if self.app.phase == "SEARCH":
             print("SEARCH")            
         
 
+    def add_layer(self):
+        self.draw_layer(list(self.kp_panel.active_triangles.values()))
+        self.draw_edges()
+
+    # -- view -----------------------------------------------------------------
+
+    def to_screen(self, x, y):
+        return x * self.scale + self.offset_x, y * self.scale + self.offset_y
+
+    def viewport_width(self):
+        return self.winfo_width() if self.winfo_width() > 1 else self.winfo_reqwidth()
+
+    def visible_world_x(self):
+        return (-self.offset_x) / self.scale, (self.viewport_width() - self.offset_x) / self.scale
+
+    def max_visible_nodes(self):
+        # as many nodes as fit across the viewport at min_node_spacing, 42 for a 600 px panel; with
+        # nodes node_horizontal_spacing apart that collapses wide layers below scale 14 / 32
+        return max(1, int(self.viewport_width() // self.min_node_spacing))
+
+    def visible_world_y(self):
+        height = self.winfo_height() if self.winfo_height() > 1 else self.winfo_reqheight()
+        return (-self.offset_y) / self.scale, (height - self.offset_y) / self.scale
+
+    def start_drag(self, event):
+        self.drag_start = (event.x, event.y)
+
+    def drag(self, event):
+        if self.drag_start is None:
+            return
+        self.offset_x += event.x - self.drag_start[0]
+        self.offset_y += event.y - self.drag_start[1]
+        self.drag_start = (event.x, event.y)
+        self.schedule_redraw()
+
+    def zoom(self, event, factor=None):
+        if factor is None:
+            factor = 1.2 if event.delta > 0 else 1 / 1.2
+        # keep the point under the cursor where it is
+        self.offset_x = event.x - (event.x - self.offset_x) * factor
+        self.offset_y = event.y - (event.y - self.offset_y) * factor
+        self.scale *= factor
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        # coalesce a burst of drag/zoom events into one redraw
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.after_idle(self.redraw)
+
+    def redraw(self):
+        self.redraw_pending = False
+        self.delete("dag")
+        for layer_num in self.layers:
+            self.render_layer(layer_num)
+            if layer_num > 0:
+                self.render_edges(layer_num)
+        self.clear_highlights()
+
+    # -- layers ---------------------------------------------------------------
+
     def draw_layer(self, triangles):
         layer_num = len(self.layers)
         width = self.winfo_reqwidth()
@@ -48,76 +119,112 @@ class DAGPanel(tk.Canvas):
             x_position = start_x_position + index * self.node_horizontal_spacing
             # Store the calculated position for each node in the current layer
             layer_positions[triangle.id] = (x_position, y_position)
-            # Draw each node in the current layer
-            self.draw_node(x_position, y_position, triangle.id)
 
         # Update self.layers with the current layer's positions
         self.layers[layer_num] = layer_positions
+        self.layer_order[layer_num] = ([triangle.id for triangle in triangles], start_x_position, y_position)
+        self.render_layer(layer_num)
+
+    def visible_range(self, layer_num):
+        # slice of the layer's left-to-right node list that falls inside the viewport
+        ids, start_x, y = self.layer_order[layer_num]
+        low_y, high_y = self.visible_world_y()
+        if y + self.node_radius < low_y or y - self.node_radius > high_y:
+            return 0, 0
+        low_x, high_x = self.visible_world_x()
+        first = int((low_x - self.node_radius - start_x) // self.node_horizontal_spacing)
+        last = int((high_x + self.node_radius - start_x) // self.node_horizontal_spacing) + 1
+        return max(first, 0), min(last, len(ids))
+
+    def is_collapsed(self, layer_num):
+        first, last = self.visible_range(layer_num)
+        return last - first > self.max_visible_nodes()
+
+    def render_layer(self, layer_num):
+        ids, start_x, y = self.layer_order[layer_num]
+        first, last = self.visible_range(layer_num)
+        if last <= first:
+            return
+        if last - first > self.max_visible_nodes():
+            self.draw_layer_summary(layer_num)
+            return
+        for index in range(first, last):
+            self.draw_node(start_x + index * self.node_horizontal_spacing, y, ids[index])
+
+    def draw_layer_summary(self, layer_num):
+        ids, start_x, y = self.layer_order[layer_num]
+        nodes = [self.kp_panel.all_triangles[node_id] for node_id in ids]
+        leaves = sum(1 for node in nodes if node.is_leaf)
+        inside = sum(1 for node in nodes if node.is_leaf and node.is_inside)
+        low_x, high_x = self.visible_world_x()
+        x0, sy = self.to_screen(max(start_x, low_x), y)
+        x1, _ = self.to_screen(min(start_x + (len(ids) - 1) * self.node_horizontal_spacing, high_x), y)
+        r = self.node_radius * self.scale
+        self.create_rectangle(x0, sy - r, x1, sy + r, fill="#e8e8e8", outline="black", tags="dag")
+        text = f"layer {layer_num}: {len(ids)} nodes"
+        if leaves:
+            text += f", {leaves} leaves ({inside} inside)"
+        self.create_text((x0 + x1) / 2, sy, text=text + "  (zoom in to expand)", font=("Arial", 10), tags="dag")
 
     def draw_node(self, x, y, node_id):
         node = self.kp_panel.all_triangles[node_id]
         fill_color = "white"
         if node.is_leaf:        
             fill_color = "#9af5b4" if node.is_inside else "#f5dd9a"
-        self.create_oval(x - self.node_radius, y - self.node_radius,
-                         x + self.node_radius, y + self.node_radius,
-                         fill=fill_color, outline="black", width=1)
-        self.create_text(x, y, text=str(node_id), font=("Arial", 12))     
-        
-
+        x, y = self.to_screen(x, y)
+        r = self.node_radius * self.scale
+        self.create_oval(x - r, y - r, x + r, y + r,
+                         fill=fill_color, outline="black", width=1, tags="dag")
+        if r >= 8:
+            self.create_text(x, y, text=str(node_id), font=("Arial", 12), tags="dag")
 
     def draw_edges(self):
         if len(self.layers) < 2:
             return
+        self.render_edges(len(self.layers) - 1)
 
-        # Get the last and second-to-last layers
-        current_layer_num = len(self.layers) - 1
+    def render_edges(self, current_layer_num):
+        # edges between a layer and the one below it, only for visible, expanded layers
+        if self.is_collapsed(current_layer_num) or self.is_collapsed(current_layer_num - 1):
+            return
         current_layer_positions = self.layers[current_layer_num]
         previous_layer_positions = self.layers[current_layer_num - 1]
+        ids, start_x, y = self.layer_order[current_layer_num]
+        first, last = self.visible_range(current_layer_num)
+        low_x, high_x = self.visible_world_x()
+        gap = 10 * min(self.scale, 1.0)  # arrows stop short of the node circles
 
-        # Iterate through each node in the current layer
-        for node_id, pos in current_layer_positions.items():
+        # Iterate through each visible node in the current layer
+        for node_id in ids[first:last]:
             node = self.app.kp_panel.all_triangles[node_id]
-            
+            pos = current_layer_positions[node_id]
+            targets = []
             # Check if the node exists in the previous layer and draw a self-edge
             if node_id in previous_layer_positions:
-                start = pos
-                end = previous_layer_positions[node_id]
-                self.create_line(start[0], start[1]+10, end[0], end[1]-10, arrow=tk.LAST, fill="black", dash=(4, 2))
+                targets.append((previous_layer_positions[node_id], (4, 2)))
             # Draw edges to children in the previous layer
             for child in node.children:
                 if child.id in previous_layer_positions:
-                    start = pos
-                    end = previous_layer_positions[child.id]
-                    self.create_line(start[0], start[1]+10, end[0], end[1]-10, arrow=tk.LAST, fill="black")
+                    targets.append((previous_layer_positions[child.id], None))
+            for end, dash in targets:
+                if not (low_x <= end[0] <= high_x or low_x <= pos[0] <= high_x):
+                    continue
+                sx, sy = self.to_screen(*pos)
+                ex, ey = self.to_screen(*end)
+                sy += gap
+                ey -= gap
+                if dash:
+                    self.create_line(sx, sy, ex, ey, arrow=tk.LAST, fill="black", dash=dash, tags="dag")
+                else:
+                    self.create_line(sx, sy, ex, ey, arrow=tk.LAST, fill="black", tags="dag")
 
     def point_location(self, point):
-        self.search_path = []
-        traveler = self.root
-        while not traveler.is_leaf:
-            self.search_path.append(traveler)
-            found = False
-            for child in traveler.children:
-                v1, v2, v3 = [(v.x, v.y) for v in child.vertices]
-                if point_inside_triangle(point, v1, v2, v3):
-                    traveler = child
-                    found = True
-                    break
-            if not found:
-                print("SP", [s.id for s in self.search_path])
-                self.is_inside = False
-                return False  # Point is not inside any child; this shouldn't happen with a correct DAG
-            
-        # Add the leaf to the search path
-        self.search_path.append(traveler)  
+        # the search itself is the engine's, the panel only keeps the path to animate it
+        kp = self.kp_panel.kp
+        self.is_inside = kp.point_location(point)
+        self.search_path = list(kp.search_path)
         print("SP", [s.id for s in self.search_path])
-        v1, v2, v3 = [(v.x, v.y) for v in traveler.vertices]
-        if point_inside_triangle(point, v1, v2, v3):
-            self.is_inside = traveler.is_inside
-            return traveler.is_inside
-        else:
-            self.is_inside = False
-            return False 
+        return self.is_inside
 
 
     def draw_search_result(self, is_inside, point):
@@ -143,7 +250,7 @@ class DAGPanel(tk.Canvas):
         if i < 0:
             return
         color = "green" if self.is_inside else "red"
-        self.app.kp_panel.create_oval(self.point[0] - 3, self.point[1] - 3, self.point[0] + 3, self.point[1] + 3, fill=color, outline=color)
+        self.app.kp_panel.draw_point(self.point, color)
         # node id list
         search_path = [node.id for node in self.search_path]
         # matched node id set
@@ -153,16 +260,18 @@ class DAGPanel(tk.Canvas):
         node_id = intersection.pop()
         pos = self.layers[i][node_id]
         self.highlight_node(pos)
-        self.app.kp_panel.delete("all")
+        self.app.kp_panel.delete("overlay")
         layer_triangles = [self.kp_panel.all_triangles[node] for node in self.layers[i].keys()]
         self.kp_panel.draw_triangulated_mesh(layer_triangles)
         # Draw the point
-        self.app.kp_panel.create_oval(self.point[0] - 3, self.point[1] - 3, self.point[0] + 3, self.point[1] + 3, fill=color, outline=color)
+        self.app.kp_panel.draw_point(self.point, color)
         self.after(2000, lambda: self.show_dag_path(i-1))
 
     def highlight_node(self, pos):
-        oval_id = self.create_oval(pos[0] - self.node_radius, pos[1] - self.node_radius,
-                    pos[0] + self.node_radius, pos[1] + self.node_radius, outline="#4eaeed", width=3)
+        # drawn on top of whatever is there, a collapsed layer gets the ring on its summary bar
+        x, y = self.to_screen(*pos)
+        r = max(self.node_radius * self.scale, 4)
+        oval_id = self.create_oval(x - r, y - r, x + r, y + r, outline="#4eaeed", width=3)
         self.highlight_node_id.append(oval_id)
      
     def find_intersection_node(self, layer, search_path):
@@ -180,6 +289,10 @@ class DAGPanel(tk.Canvas):
     def clear(self):
         self.search_path.clear()
         self.layers.clear()
+        self.layer_order.clear()
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
         self.result_text_id = None
         self.root = None
         self.point = None
@@ -14,11 +14,20 @@ class InfoPanel(tk.Frame):
 
         self.continue_button = tk.Button(self, text="NEXT ->", font=('Arial', 11, 'bold'), command=self.next_phase)
         self.continue_button.pack(side="left", padx=10, pady=10)
+
+        self.cancel_button = tk.Button(self, text="CANCEL", font=('Arial', 11, 'bold'), command=self.cancel_build)
+        self.cancel_button.pack(side="left", padx=10, pady=10)
+
+        self.progress_label = tk.Label(self, font=('Arial', 10), text="")
+        self.progress_label.pack(side="left", padx=10, pady=10)
         
         self.label = tk.Label(self, font=('Arial', 11, 'bold'), text="Start to draw: left click to add vertices, right click to remove")
         self.label.pack(side="right", padx=10, pady=10)
 
     def next_phase(self):
+        if self.app.kp_panel.is_busy():
+            # the build worker has not produced the step on screen yet
+            return
         current_index = phases.index(self.app.phase)
         if self.app.phase=="REMOVE" and len(self.app.kp_panel.active_triangles) > 1:
             next_phase = phases[(current_index - 1) % len(phases)]
@@ -35,6 +44,12 @@ class InfoPanel(tk.Frame):
     def clear_phase(self):
         self.app.clear_drawing()
 
+    def cancel_build(self):
+        self.app.cancel_build()
+
+    def update_progress(self, text):
+        self.progress_label.config(text=text)
+
     def update_phase_label(self, phase):
         phase_descriptions = {
             "DRAW": "Draw a Polygon:  Left Click to ADD vertices, Right Click to REMOVE vertices",
@@ -23,15 +23,8 @@ Edge Intersection: Check if any edges from the two triangles intersect. This inv
 
 #     return (d1 > 0 and d2 > 0 and d3 > 0) or (d1 < 0 and d2 < 0 and d3 < 0)
 
-def point_inside_triangle(pt, v1, v2, v3):
-    def sign(p1, p2, p3):
-        return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
-
-    b1 = sign(pt, v1, v2) < 0.0
-    b2 = sign(pt, v2, v3) < 0.0
-    b3 = sign(pt, v3, v1) < 0.0
-
-    return ((b1 == b2) & (b2 == b3))
+# the live versions are shared with the engine, see geometry.py
+from geometry import point_inside_triangle, triangles_overlap
 
 # def point_inside_triangle(triangle, point):
     
@@ -109,15 +102,13 @@ def point_inside_triangle(pt, v1, v2, v3):
 
 
 
-from shapely.geometry import Polygon
-
-def triangles_overlap(triangle1, triangle2):
-    # Create Polygon objects for each triangle
-    poly1 = Polygon([(v.x, v.y) for v in triangle1.vertices])
-    poly2 = Polygon([(v.x, v.y) for v in triangle2.vertices])
+# def triangles_overlap(triangle1, triangle2):
+#     # Create Polygon objects for each triangle
+#     poly1 = Polygon([(v.x, v.y) for v in triangle1.vertices])
+#     poly2 = Polygon([(v.x, v.y) for v in triangle2.vertices])
     
-    # Check if the two polygons overlap
-    return poly1.overlaps(poly2) or poly1.contains(poly2) or poly2.contains(poly1)
+#     # Check if the two polygons overlap
+#     return poly1.overlaps(poly2) or poly1.contains(poly2) or poly2.contains(poly1)
 
 
 # def triangles_overlap_shapely(triangle1, triangle2):
@@ -0,0 +1,131 @@
+# predicates.py
+"""
+Orientation and point-in-triangle tests that are always right.
+
+The plain float determinant can get the sign wrong (or come out exactly 0)
+when the point is on or very close to the line, which is where triangles of
+the hierarchy meet and where retriangulate leaves thin slivers. Each test is
+first done in floating point together with an error bound; only when the
+result is smaller than the bound is it recomputed exactly with integers,
+which the bound makes rare enough not to show up in the timings.
+
+    orient2d(a, b, p)                 sign of the turn a -> b -> p: 1 left, -1 right, 0 on the line
+    orient2d_many(a, b, p, bound)     the same for (n, 2) arrays, as values with the exact sign
+    point_in_triangle(p, a, b, c)     closed test, points on edges and vertices are inside
+    points_in_triangles(points, tri)  the same for (n, 2) points against (n, 3, 2) triangles
+"""
+import numpy as np
+
+U = np.finfo(np.float64).eps / 2  # unit roundoff
+
+# Shewchuk's orient2d filter, relative to |left| + |right| of the determinant
+DYNAMIC = (3 + 16 * U) * U
+# the same for any test whose coordinates are at most M in magnitude: |left| + |right| <= 8 M**2
+STATIC = 25 * U
+
+
+def exact_orient2d(a, b, p):
+    # floats are integers times a power of two: scale all six to integers and use Python ints
+    coords = (a[0], a[1], b[0], b[1], p[0], p[1])
+    ratios = [float(c).as_integer_ratio() for c in coords]
+    denominator = max(d for _, d in ratios)
+    ax, ay, bx, by, px, py = (n * (denominator // d) for n, d in ratios)
+    det = (px - bx) * (ay - by) - (ax - bx) * (py - by)
+    return (det > 0) - (det < 0)
+
+
+def orient2d(a, b, p):
+    # same operand order as the old geometry.sign(p, a, b)
+    left = (p[0] - b[0]) * (a[1] - b[1])
+    right = (a[0] - b[0]) * (p[1] - b[1])
+    det = left - right
+    if abs(det) > DYNAMIC * (abs(left) + abs(right)):
+        return 1 if det > 0 else -1
+    return exact_orient2d(a, b, p)
+
+
+def static_bound(points, tri):
+    # per point error bound for orient2d_many: every coordinate of a test is at most M in magnitude
+    magnitude = np.maximum(np.abs(points).max(axis=1), np.abs(tri).max(initial=0.0))
+    return STATIC * magnitude * magnitude
+
+
+def orient2d_many(a, b, p, bound):
+    det = (p[:, 0] - b[:, 0]) * (a[:, 1] - b[:, 1]) - (a[:, 0] - b[:, 0]) * (p[:, 1] - b[:, 1])
+    for i in np.flatnonzero(np.abs(det) <= bound):
+        det[i] = exact_orient2d(a[i], b[i], p[i])
+    return det  # only the sign is meaningful
+
+
+def point_in_triangle(p, a, b, c):
+    d1, d2, d3 = orient2d(a, b, p), orient2d(b, c, p), orient2d(c, a, p)
+    has_neg = d1 < 0 or d2 < 0 or d3 < 0
+    has_pos = d1 > 0 or d2 > 0 or d3 > 0
+    # all three 0 only happens for a degenerate triangle, which contains nothing
+    return (has_neg or has_pos) and not (has_neg and has_pos)
+
+
+def combine(d1, d2, d3):
+    # closed point in triangle from the three orientation signs (or exact-signed values), vectorized
+    has_neg = (d1 < 0) | (d2 < 0) | (d3 < 0)
+    has_pos = (d1 > 0) | (d2 > 0) | (d3 > 0)
+    return (has_neg | has_pos) & ~(has_neg & has_pos)
+
+
+def points_in_triangles(points, tri, bound=None):
+    # bound: per point error bound, static_bound(points, tri) unless the caller has one that covers it
+    if bound is None:
+        bound = static_bound(points, tri)
+    v1, v2, v3 = tri[:, 0], tri[:, 1], tri[:, 2]
+    px, py = points[:, 0], points[:, 1]
+
+    def det(a, b):
+        return (px - b[:, 0]) * (a[:, 1] - b[:, 1]) - (a[:, 0] - b[:, 0]) * (py - b[:, 1])
+
+    d1, d2, d3 = det(v1, v2), det(v2, v3), det(v3, v1)
+    # one pass to find the (rare) tests the filter can't decide
+    smallest = np.minimum(np.abs(d1), np.abs(d2))
+    np.minimum(smallest, np.abs(d3), out=smallest)
+    for i in np.flatnonzero(smallest <= bound):
+        d1[i] = exact_orient2d(v1[i], v2[i], points[i])
+        d2[i] = exact_orient2d(v2[i], v3[i], points[i])
+        d3[i] = exact_orient2d(v3[i], v1[i], points[i])
+    return combine(d1, d2, d3)
+
+
+if __name__ == "__main__":
+    """
+    BENCHMARK: cost of the filter over the plain float test, and points exactly on shared edges
+    """
+    import time
+    from kp import Kirkpatrick, generate_simple_polygon
+
+    def plain(points, tri):
+        def sign(p, a, b):
+            return (p[:, 0] - b[:, 0]) * (a[:, 1] - b[:, 1]) - (a[:, 0] - b[:, 0]) * (p[:, 1] - b[:, 1])
+        b1 = sign(points, tri[:, 0], tri[:, 1]) < 0.0
+        b2 = sign(points, tri[:, 1], tri[:, 2]) < 0.0
+        b3 = sign(points, tri[:, 2], tri[:, 0]) < 0.0
+        return (b1 == b2) & (b2 == b3)
+
+    np.random.seed(5)
+    tri = np.random.uniform(-1, 1, size=(1000000, 3, 2))
+    points = np.random.uniform(-1, 1, size=(1000000, 2))
+    # the index computes the bound once per batch, outside the per-level tests
+    bound = static_bound(points, tri)
+    for name, test in (("plain float", plain), ("filtered exact", lambda p, t: points_in_triangles(p, t, bound))):
+        timings = []
+        for _ in range(5):
+            start_time = time.perf_counter()
+            test(points, tri)
+            timings.append(time.perf_counter() - start_time)
+        print(f"{name:15s} {min(timings) * 1000:7.1f} ms for 1M tests")
+
+    kp = Kirkpatrick(generate_simple_polygon(1000), force_dag=True)
+    kp.preprocessing()
+    frozen = kp.freeze()
+    leaves = frozen.tri[frozen.is_leaf]
+    # points exactly on a leaf edge: the old strict test rejected them in both triangles
+    on_edges = np.concatenate((leaves[:, 0] * 0.5 + leaves[:, 1] * 0.5, leaves[:, 0]))
+    print(f"points on leaf edges and vertices that reach a leaf: "
+          f"{(frozen.locate_leaves(on_edges) >= 0).sum()} / {len(on_edges)}")
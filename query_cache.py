@@ -0,0 +1,262 @@
+# query_cache.py
+"""
+Bounded cache of query answers keyed by grid cell.
+
+Event streams repeat themselves: parked vehicles and fixed sensors report the
+same coordinates over and over. SnapCache snaps every query to a square grid
+cell of side `cell` and remembers the answer per cell, but only for cells that
+lie strictly inside a single leaf triangle (or entirely outside the polygon's
+bounding box), so every point of the cell has the same answer and cached
+answers are exactly what the index would say. Cells crossing a leaf edge are
+answered by the index every time. A ConvexIndex has no leaves: there a cell is
+cached when its four corners are inside the polygon, which convexity extends to
+the whole cell, or when they are all outside one polygon edge or the bounding box.
+
+Entries live in fixed arrays sized from max_bytes and are evicted with the
+CLOCK policy: a hit sets the entry's reference bit, the hand clears bits until
+it finds an entry that wasn't used since its last pass.
+
+    cache = SnapCache(frozen, cell=1e-4)
+    cache.locate(point) / cache.locate_many(points)   same answers as frozen
+    cache.cache_stats()                                hits, misses, evictions, hit rate
+"""
+import math
+import threading
+from itertools import repeat
+import numpy as np
+from convex import ConvexIndex
+from predicates import orient2d_many, static_bound
+
+# memory per entry: dict slot and key/slot int objects (~170 bytes, measured with tracemalloc
+# on a full cache) plus the key, value and reference bit arrays
+ENTRY_BYTES = 180
+# cells are tested slightly enlarged, by far more than the rounding in snapping a point
+# to its cell, so a point near a cell side is still covered by the cell it snaps to
+PAD = 1e-12
+# keys pack both cell coordinates into one int64
+KEY_RANGE = 2 ** 31
+
+
+class SnapCache:
+    def __init__(self, index, cell, max_bytes=16 << 20, origin=(0.0, 0.0)):
+        if hasattr(index, "freeze"):
+            index = index.freeze()
+        self.index = index  # FrozenIndex, CompactIndex or ConvexIndex
+        self.stats = index.stats  # the index's rejection counters, for the server
+        self.convex = isinstance(index, ConvexIndex)  # answered by the wedge search, no leaves
+        self.cell = float(cell)
+        self.origin = np.array(origin, dtype=np.float64)
+        self.origin_xy = tuple(self.origin.tolist())  # for the scalar path, same arithmetic as the arrays
+        self.capacity = max(1, max_bytes // ENTRY_BYTES)
+        self.slots = {}  # key -> slot
+        self.keys = np.zeros(self.capacity, dtype=np.int64)
+        self.values = np.zeros(self.capacity, dtype=bool)
+        self.referenced = np.zeros(self.capacity, dtype=bool)
+        self.used = 0
+        self.hand = 0
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.uncacheable = 0  # misses whose cell crosses a leaf edge
+        self.lock = threading.Lock()  # a slot may be reused between a lookup and reading its value
+
+    def cell_keys(self, points):
+        # (keys, ok): ok is False for points too far from the origin (or not finite) to pack
+        cells = np.floor((points - self.origin) / self.cell)
+        ok = (np.abs(cells) < KEY_RANGE).all(axis=1)
+        cells = np.where(ok[:, None], cells, 0).astype(np.int64)
+        return cells[:, 0] * (2 * KEY_RANGE) + (cells[:, 1] + KEY_RANGE), ok
+
+    def cell_boxes(self, keys):
+        # enlarged (low, high) corners of the cells
+        ix = keys // (2 * KEY_RANGE)
+        iy = keys % (2 * KEY_RANGE) - KEY_RANGE
+        low = self.origin + np.column_stack((ix, iy)) * self.cell
+        pad = PAD * (np.abs(low) + np.abs(self.origin) + self.cell)
+        return low - pad, low + self.cell + pad
+
+    def cells_in_leaves(self, keys, leaves):
+        # True where the whole (enlarged) cell is strictly inside the leaf: all twelve corner/edge
+        # orientations share a sign, decided exactly
+        low, high = self.cell_boxes(keys)
+        tri = self.index.tri_rows(leaves)
+        signs = []
+        for corner in (low, high, np.column_stack((low[:, 0], high[:, 1])), np.column_stack((high[:, 0], low[:, 1]))):
+            bound = static_bound(corner, tri)
+            for a, b in ((tri[:, 0], tri[:, 1]), (tri[:, 1], tri[:, 2]), (tri[:, 2], tri[:, 0])):
+                signs.append(orient2d_many(a, b, corner, bound))
+        signs = np.array(signs)
+        return (signs > 0).all(axis=0) | (signs < 0).all(axis=0)
+
+    def cells_in_convex(self, keys):
+        # True where all four (enlarged) corners are inside the convex polygon, so the whole cell is,
+        # or all four are strictly right of one polygon edge (a separating line) or outside its box
+        low, high = self.cell_boxes(keys)
+        corners = np.concatenate((low, high, np.column_stack((low[:, 0], high[:, 1])),
+                                  np.column_stack((high[:, 0], low[:, 1]))))
+        inside, edges = self.index.contains_many(corners, edges=True)
+        cacheable = inside.reshape(4, -1).all(axis=0) | self.cells_outside_box(keys)
+        # the outer edge of each corner's wedge is the likeliest separating line for the cell
+        ring = self.index.ring
+        bound = static_bound(corners, self.index.extent)
+        for edge in edges.reshape(4, -1):
+            edge = np.tile(edge, 4)
+            right = orient2d_many(ring[edge], ring[edge + 1], corners, bound) < 0
+            cacheable |= right.reshape(4, -1).all(axis=0)
+        return cacheable
+
+    def cells_outside_box(self, keys):
+        bounds = self.index.box if self.convex else self.index.bounds
+        if bounds is None:
+            return np.zeros(len(keys), dtype=bool)
+        low, high = self.cell_boxes(keys)
+        return ((high < bounds[0]) | (low > bounds[1])).any(axis=1)
+
+    def insert(self, key, value):
+        # CLOCK: under the lock
+        if key in self.slots:
+            return
+        if self.used < self.capacity:
+            slot = self.used
+            self.used += 1
+        else:
+            while self.referenced[self.hand]:
+                self.referenced[self.hand] = False
+                self.hand = (self.hand + 1) % self.capacity
+            slot = self.hand
+            self.hand = (self.hand + 1) % self.capacity
+            del self.slots[int(self.keys[slot])]
+            self.evictions += 1
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.referenced[slot] = False
+        self.slots[key] = slot
+        self.inserts += 1
+
+    def locate_many(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(points)
+        keys, ok = self.cell_keys(points)
+        # pre-pass: every point whose cell is cached is answered here, the rest go to the index
+        slots = np.full(n, -1, dtype=np.int64)
+        inside = np.zeros(n, dtype=bool)
+        with self.lock:
+            if ok.any():
+                slots[ok] = np.fromiter(map(self.slots.get, keys[ok].tolist(), repeat(-1)), dtype=np.int64,
+                                        count=int(ok.sum()))
+            hit = slots >= 0
+            inside[hit] = self.values[slots[hit]]
+            self.referenced[slots[hit]] = True
+            self.hits += int(hit.sum())
+            self.misses += n - int(hit.sum())
+        miss = np.flatnonzero(~hit)
+
+        if len(miss) and self.convex:
+            inside[miss] = self.index.locate_many(points[miss])
+            todo = miss[ok[miss]]
+            cacheable = self.cells_in_convex(keys[todo])
+            store = todo[cacheable]
+            store = store[np.unique(keys[store], return_index=True)[1]]
+            with self.lock:
+                for key, value in zip(keys[store].tolist(), inside[store].tolist()):
+                    self.insert(key, value)
+                self.uncacheable += len(todo) - int(cacheable.sum())
+        elif len(miss):
+            # the index's own locate_many, keeping the leaves to see which cells can be cached
+            index = self.index
+            found = miss[index.candidates(points[miss])]
+            leaves = np.full(n, -1, dtype=np.int64)
+            leaves[found] = index.locate_leaves(points[found])
+            inside[miss] = (leaves[miss] >= 0) & index.is_inside[np.maximum(leaves[miss], 0)]
+
+            todo = miss[ok[miss]]
+            in_leaf = todo[leaves[todo] >= 0]
+            cacheable = np.zeros(n, dtype=bool)
+            cacheable[in_leaf] = self.cells_in_leaves(keys[in_leaf], leaves[in_leaf])
+            no_leaf = todo[leaves[todo] < 0]
+            cacheable[no_leaf] = self.cells_outside_box(keys[no_leaf])
+            store = np.flatnonzero(cacheable)
+            store = store[np.unique(keys[store], return_index=True)[1]]
+            with self.lock:
+                for key, value in zip(keys[store].tolist(), inside[store].tolist()):
+                    self.insert(key, value)
+                self.uncacheable += len(todo) - int(cacheable.sum())
+        return inside
+
+    def locate(self, point):
+        x = (point[0] - self.origin_xy[0]) / self.cell
+        y = (point[1] - self.origin_xy[1]) / self.cell
+        if abs(x) < KEY_RANGE - 1 and abs(y) < KEY_RANGE - 1:  # false for nan and inf too
+            key = math.floor(x) * (2 * KEY_RANGE) + (math.floor(y) + KEY_RANGE)
+            with self.lock:
+                slot = self.slots.get(key)
+                if slot is not None:
+                    self.referenced[slot] = True
+                    self.hits += 1
+                    return bool(self.values[slot])
+        return bool(self.locate_many([point])[0])
+
+    def clear(self):
+        with self.lock:
+            self.slots.clear()
+            self.referenced[:] = False
+            self.used = 0
+            self.hand = 0
+
+    def cache_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "inserts": self.inserts,
+                    "evictions": self.evictions, "uncacheable": self.uncacheable,
+                    "entries": len(self.slots), "capacity": self.capacity,
+                    "bytes": self.capacity * ENTRY_BYTES,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+if __name__ == "__main__":
+    """
+    BENCHMARK: a stream of repeating sensor positions plus fresh points, through the index alone
+    and through the cache, in server sized batches and one point at a time
+    """
+    import time
+    from kp import Kirkpatrick, generate_simple_polygon
+
+    def bench(name, frozen):
+        sensors = np.random.uniform(-1.2, 1.2, size=(5000, 2))
+        for repeated in [0.5, 0.9, 0.99]:
+            n = 200000
+            from_sensor = np.random.random(n) < repeated
+            stream = np.random.uniform(-1.2, 1.2, size=(n, 2))
+            # sensors jitter a little around their position, well below the cell size
+            stream[from_sensor] = sensors[np.random.randint(len(sensors), size=from_sensor.sum())]
+            stream[from_sensor] += np.random.normal(scale=1e-7, size=(from_sensor.sum(), 2))
+            cache = SnapCache(frozen, cell=1e-5)
+
+            start_time = time.perf_counter()
+            expected = np.concatenate([frozen.locate_many(stream[i:i + 256]) for i in range(0, n, 256)])
+            plain = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            got = np.concatenate([cache.locate_many(stream[i:i + 256]) for i in range(0, n, 256)])
+            cached = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            scalar = [cache.locate(p) for p in stream[:20000].tolist()]
+            one_by_one = (time.perf_counter() - start_time) / 20000
+            start_time = time.perf_counter()
+            for p in stream[:500].tolist():
+                frozen.locate(p)
+            index_one = (time.perf_counter() - start_time) / 500
+            stats = cache.cache_stats()
+            print(f"{name:6s}  repeated {repeated:4.0%}  index {plain:.2f}s  cached {cached:.2f}s  "
+                  f"single {index_one * 1e6:.0f}us -> {one_by_one * 1e6:.1f}us  hit rate {stats['hit_rate']:.2f}  "
+                  f"evictions {stats['evictions']}  uncacheable {stats['uncacheable']}  "
+                  f"mismatches {(expected != got).sum() + (expected[:20000] != scalar).sum()}")
+
+    np.random.seed(8)
+    angles = np.sort(np.random.uniform(0, 2 * np.pi, 20000))
+    polygons = {"simple": generate_simple_polygon(20000), "convex": np.column_stack((np.cos(angles), np.sin(angles)))}
+    for name, polygon in polygons.items():
+        kp = Kirkpatrick(polygon)
+        kp.preprocessing()
+        frozen = kp.freeze()  # a ConvexIndex for the convex polygon
+        bench(name, frozen)
@@ -0,0 +1,222 @@
+# server.py
+"""
+Asyncio point location server.
+
+Holds one or more built indexes and answers single point queries over TCP or a
+Unix domain socket. Concurrent requests for the same index are coalesced into
+micro-batches so they go through FrozenIndex.locate_many in one call.
+
+Wire format (little endian, fixed size frames):
+    request   op:u8  req_id:u32  index:u16  x:f64  y:f64      (23 bytes)
+    response  op:u8  req_id:u32  result:u8                     (6 bytes)
+              result is 0 outside, 1 inside, or one of the error codes below
+    OP_STATS  response is followed by a u32 length and a JSON metrics body.
+"""
+import asyncio
+import json
+import math
+import struct
+import time
+from collections import deque
+import numpy as np
+from kp import rejection_rates
+from query_cache import SnapCache
+
+REQUEST = struct.Struct("<BIHdd")
+RESPONSE = struct.Struct("<BIB")
+LENGTH = struct.Struct("<I")
+
+OP_QUERY = 1
+OP_STATS = 2
+
+OUTSIDE = 0
+INSIDE = 1
+QUERY_FAILED = 253  # the index raised while answering the batch
+INVALID_POINT = 254  # x or y is nan or infinite
+UNKNOWN_INDEX = 255
+
+
+class Metrics:
+    def __init__(self, window=10000):
+        self.window = window
+        # the last `window` of each, older values fall off the front in O(1)
+        self.latencies = deque(maxlen=window)  # seconds, from frame received to response written
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+
+    def add_latency(self, seconds):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def add_batch(self, size):
+        self.batches += 1
+        self.batch_sizes.append(size)
+
+    def snapshot(self):
+        stats = {"requests": self.requests, "batches": self.batches}
+        if self.latencies:
+            lat = np.fromiter(self.latencies, dtype=np.float64, count=len(self.latencies)) * 1e6
+            stats["latency_us"] = {
+                "mean": float(lat.mean()),
+                "p50": float(np.percentile(lat, 50)),
+                "p99": float(np.percentile(lat, 99)),
+                "max": float(lat.max()),
+            }
+        if self.batch_sizes:
+            sizes = np.fromiter(self.batch_sizes, dtype=np.int64, count=len(self.batch_sizes))
+            stats["batch_size"] = {
+                "mean": float(sizes.mean()),
+                "p50": float(np.percentile(sizes, 50)),
+                "max": int(sizes.max()),
+            }
+        return stats
+
+
+class MicroBatcher:
+    """Collects queries for one index and flushes them as a single batch."""
+    def __init__(self, index, metrics, max_delay=0.001, max_batch=256):
+        self.index = index  # anything with locate_many(points)
+        self.metrics = metrics
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.pending = []
+        self.flush_handle = None
+
+    def submit(self, x, y):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((x, y, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        points = np.array([(x, y) for x, y, _ in batch], dtype=np.float64)
+        try:
+            results = self.index.locate_many(points)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.metrics.add_batch(len(batch))
+        for (_, _, future), inside in zip(batch, results):
+            if not future.done():
+                future.set_result(bool(inside))
+
+
+class PointLocationServer:
+    def __init__(self, indexes, max_delay=0.001, max_batch=256, snap=None):
+        # indexes: {index number: FrozenIndex or Kirkpatrick}
+        # snap: grid cell size of a query_cache.SnapCache in front of every index, None for no cache
+        self.metrics = Metrics()
+        self.batchers = {}
+        for key, index in indexes.items():
+            if hasattr(index, "freeze"):
+                index = index.freeze()
+            if snap is not None:
+                index = SnapCache(index, snap)
+            self.batchers[key] = MicroBatcher(index, self.metrics, max_delay, max_batch)
+        self.server = None
+
+    def stats(self):
+        stats = self.metrics.snapshot()
+        # how many queries each index answered from its bounding box / hull alone
+        stats["rejection"] = {str(key): rejection_rates(batcher.index.stats)
+                              for key, batcher in self.batchers.items() if hasattr(batcher.index, "stats")}
+        caches = {str(key): batcher.index.cache_stats()
+                  for key, batcher in self.batchers.items() if hasattr(batcher.index, "cache_stats")}
+        if caches:
+            stats["cache"] = caches
+        return stats
+
+    async def handle_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                try:
+                    frame = await reader.readexactly(REQUEST.size)
+                except asyncio.IncompleteReadError:
+                    break
+                received = time.perf_counter()
+                op, req_id, key, x, y = REQUEST.unpack(frame)
+                if op == OP_STATS:
+                    body = json.dumps(self.stats()).encode()
+                    writer.write(RESPONSE.pack(op, req_id, 0) + LENGTH.pack(len(body)) + body)
+                    await writer.drain()
+                    continue
+                batcher = self.batchers.get(key)
+                if batcher is None or not (math.isfinite(x) and math.isfinite(y)):
+                    # answered here: a bad point must not fail the batch it would have joined
+                    writer.write(RESPONSE.pack(op, req_id, UNKNOWN_INDEX if batcher is None else INVALID_POINT))
+                    await writer.drain()
+                    continue
+                # answer out of order so one client can keep many requests in flight
+                task = asyncio.ensure_future(self.answer(writer, batcher, req_id, x, y, received))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def answer(self, writer, batcher, req_id, x, y, received):
+        # always write a frame, the client is waiting for this req_id
+        try:
+            result = INSIDE if await batcher.submit(x, y) else OUTSIDE
+        except Exception:
+            result = QUERY_FAILED
+        writer.write(RESPONSE.pack(OP_QUERY, req_id, result))
+        self.metrics.add_latency(time.perf_counter() - received)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server
+
+    async def serve_forever(self, host="127.0.0.1", port=8765, path=None):
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    from kp import Kirkpatrick, generate_simple_polygon
+
+    parser = argparse.ArgumentParser(description="Serve point location queries for random polygons")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="serve on a Unix domain socket instead of TCP")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000], help="one index per polygon size")
+    parser.add_argument("--max-delay", type=float, default=0.001, help="seconds a request may wait for a batch")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--snap", type=float, default=None, help="cache answers per grid cell of this size")
+    args = parser.parse_args()
+
+    indexes = {}
+    for i, n in enumerate(args.sizes):
+        kp = Kirkpatrick(generate_simple_polygon(n))
+        start_time = time.time()
+        kp.preprocessing()
+        indexes[i] = kp.freeze()
+        print(f"index {i}: {n} vertices built in {time.time() - start_time:.2f}s")
+
+    server = PointLocationServer(indexes, max_delay=args.max_delay, max_batch=args.max_batch, snap=args.snap)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"serving on {where}")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
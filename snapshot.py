@@ -0,0 +1,79 @@
+# snapshot.py
+"""
+Zero-downtime polygon updates.
+
+A LiveIndex always points at one immutable FrozenIndex snapshot. Updating the
+polygon builds a fresh Kirkpatrick on a background thread, freezes it and then
+swaps the reference. Readers grab the reference once per query, so in-flight
+queries finish on the snapshot they started with and the old snapshot is
+released as soon as the last reader drops it.
+"""
+import threading
+from kp import Kirkpatrick
+from convex import is_convex
+from loaders import Rings
+
+
+def build_snapshot(points, cache=None):
+    if cache is not None:
+        # an IndexCache: the same polygon built before, here or by another process, is just loaded
+        engine = "convex" if not isinstance(points, Rings) and is_convex(points) else "kirkpatrick"
+        return cache.get_or_build(points, engine).index
+    kp = Kirkpatrick(points)
+    kp.preprocessing()
+    # only the arrays survive, the Vertex/TriangleNode graph is garbage once kp goes out of scope
+    return kp.freeze()
+
+
+class LiveIndex:
+    def __init__(self, points=None, snapshot=None, cache=None):
+        self.snapshot = snapshot
+        self.cache = cache
+        self.version = 0
+        # one rebuild at a time per index, so snapshots are swapped in the order they were built
+        self.build_lock = threading.Lock()
+        self.build_thread = None
+        self.build_error = None
+        if points is not None:
+            self.swap(build_snapshot(points, self.cache))
+
+    def current(self):
+        # a plain attribute read is atomic, callers keep using what they got even if a swap happens
+        return self.snapshot
+
+    def swap(self, snapshot):
+        self.snapshot = snapshot
+        self.version += 1
+
+    def rebuild(self, points):
+        with self.build_lock:
+            snapshot = build_snapshot(points, self.cache)
+            self.swap(snapshot)
+        return snapshot
+
+    def update(self, points, on_done=None):
+        """Rebuild in a background thread, readers keep using the current snapshot until the swap."""
+        def run():
+            try:
+                snapshot = self.rebuild(points)
+                self.build_error = None
+            except Exception as e:
+                self.build_error = e
+                snapshot = None
+            if on_done is not None:
+                on_done(snapshot)
+
+        self.build_thread = threading.Thread(target=run, name="kp-snapshot-build", daemon=True)
+        self.build_thread.start()
+        return self.build_thread
+
+    def wait(self, timeout=None):
+        if self.build_thread is not None:
+            self.build_thread.join(timeout)
+        return self.build_error is None
+
+    def locate(self, point):
+        return self.current().locate(point)
+
+    def locate_many(self, points):
+        return self.current().locate_many(points)
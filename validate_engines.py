@@ -0,0 +1,71 @@
+# validate_engines.py
+"""
+Runs every engine in locators.ENGINES over the same corpus of polygons and
+query points and checks they agree with each other (and with shapely when it
+is installed), including after a save/load round trip.
+"""
+import io
+import numpy as np
+from kp import generate_simple_polygon
+from locators import ENGINES, Locator, select_locator
+
+
+def regular_polygon(n, radius=1.0):
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    return np.column_stack((radius * np.cos(t), radius * np.sin(t)))
+
+
+def corpus():
+    np.random.seed(7)
+    yield "triangle", np.array([(0.0, 0.0), (1.0, 0.0), (0.3, 1.0)])
+    yield "square", np.array([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)])
+    yield "hexagon", regular_polygon(6)
+    yield "L shape", np.array([(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)], dtype=float)
+    yield "comb", np.array([(0, 0), (5, 0), (5, 3), (4, 3), (4, 1), (3, 1), (3, 3), (2, 3),
+                            (2, 1), (1, 1), (1, 3), (0, 3)], dtype=float)
+    for n in [10, 100, 1000]:
+        yield f"random {n}", generate_simple_polygon(n)
+    # closed rings, last vertex repeating the first, as np.array(polygon.exterior.coords) gives them
+    yield "closed square", np.array([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0), (0.0, 0.0)])
+    ring = generate_simple_polygon(100)
+    yield "closed random", np.vstack((ring, ring[:1]))
+
+
+def reference(points, queries):
+    try:
+        import shapely
+        from shapely.geometry import Polygon
+    except ImportError:
+        return ENGINES["raycast"]().build(points).locate_many(queries)
+    return shapely.contains_xy(Polygon(points), queries[:, 0], queries[:, 1])
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, points in corpus():
+        low, high = points.min(axis=0), points.max(axis=0)
+        margin = (high - low) * 0.2
+        queries = np.random.uniform(low - margin, high + margin, size=(5000, 2))
+        expected = reference(points, queries)
+        row = [f"{name:13s}"]
+        for engine in ENGINES.values():
+            try:
+                locator = engine().build(points)
+            except ValueError:
+                if engine.name != "convex":
+                    raise
+                row.append(f"{engine.name}: n/a")  # convex engine on a non-convex polygon
+                continue
+            buffer = io.BytesIO()
+            locator.save(buffer)
+            buffer.seek(0)
+            loaded = Locator.load(buffer)
+            mismatches = int((locator.locate_many(queries) != expected).sum())
+            mismatches += int((loaded.locate_many(queries) != expected).sum())
+            scalar = int(sum(locator.locate(q) != e for q, e in zip(queries[:200], expected[:200])))
+            failures += mismatches + scalar
+            row.append(f"{engine.name}: {mismatches + scalar}")
+        chosen, report = select_locator(points, expected_queries=100000)
+        row.append(f"-> selected {chosen.name}")
+        print("  ".join(row))
+    print("all engines agree" if failures == 0 else f"{failures} mismatches")